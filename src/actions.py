@@ -91,10 +91,10 @@ class Action(object):
         raise PyGenException('Action not defined')
 
     def matching_services(self, target):
-        return self.api.services().matching(target)
+        return self.api.services(filtered=False).matching(target)
 
     def matching_containers(self, target):
-        return self.api.containers().matching(target)
+        return self.api.containers(filtered=False).matching(target)
 
 
 @register('restart', ExecutionStrategy.MANAGER)
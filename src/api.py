@@ -1,10 +1,14 @@
 import os
+from functools import partial
+from multiprocessing.pool import ThreadPool
 
 import docker
+from docker.errors import NotFound
 
+from cache import ContainerCache, NodeCache
 from metrics import Histogram
-from models import ContainerInfo, ServiceInfo, NodeInfo
-from resources import ContainerList, ServiceList, ResourceList
+from models import ContainerInfo, ServiceInfo, NodeInfo, detach_raw
+from resources import ContainerList, ServiceList, TaskList, ResourceList
 from utils import EnhancedDict, Lazy
 
 
@@ -23,52 +27,332 @@ nodes_histogram = Histogram(
 
 
 class DockerApi(object):
-    def __init__(self, address=os.environ.get('DOCKER_ADDRESS')):
+    CONTAINER_ACTIONS = ('attach', 'commit', 'copy', 'create', 'destroy', 'detach', 'die',
+                         'exec_create', 'exec_detach', 'exec_die', 'exec_start', 'export',
+                         'health_status', 'kill', 'oom', 'pause', 'rename', 'resize', 'restart',
+                         'start', 'stop', 'top', 'unpause', 'update')
+    SERVICE_FILTERS = ('id', 'label', 'name', 'mode')
+
+    def __init__(self, address=os.environ.get('DOCKER_ADDRESS'), container_cache=False, concurrency=1,
+                 single_fetch=False, node_cache_ttl=0, filters=None, lazy_raw=False):
         if address:
             self.client = docker.DockerClient(address, version='auto')
         else:
             self.client = docker.from_env(version='auto')
 
+        self.concurrency = concurrency
+        self.single_fetch = single_fetch
+        self.filters = filters or dict()
+        self.lazy_raw = lazy_raw
+        self._pool = None
+        self._swarm_mode = None
+        self._container_snapshots = dict()
+
+        if container_cache:
+            self.container_cache = ContainerCache(self._load_containers, self._refresh_container)
+        else:
+            self.container_cache = None
+
+        if node_cache_ttl > 0:
+            self.node_cache = NodeCache(self._list_nodes, self._inspect_node, ttl=node_cache_ttl)
+        else:
+            self.node_cache = None
+
     @property
     def is_swarm_mode(self):
-        return len(self.client.swarm.attrs) > 0
+        if self._swarm_mode is None:
+            self._swarm_mode = len(self.client.swarm.attrs) > 0
+
+        return self._swarm_mode
+
+    def refresh(self):
+        self._swarm_mode = None
+
+        if self.container_cache:
+            self.container_cache.invalidate()
+
+        if self.node_cache:
+            self.node_cache.invalidate()
+
+    def containers(self, filtered=True, **kwargs):
+        if self.container_cache and (filtered or not self.filters) and set(kwargs) <= {'all'}:
+            return self.container_cache.containers(all=kwargs.get('all'))
+
+        if filtered and self.filters:
+            kwargs['filters'] = self._with_filters(kwargs.get('filters'))
+
+        # the unfiltered listings of the actions can run on other threads, they get new models
+        # and keep the containers they already inspected for the actions to use
+        return self._list_containers(snapshot=filtered, **kwargs)
+
+    def _load_containers(self):
+        if self.filters:
+            return self._list_containers(all=True, filters=self._with_filters(None))
+
+        return self._list_containers(all=True)
+
+    def _with_filters(self, filters, supported=None):
+        result = dict((key, list(values)) for key, values in self.filters.items()
+                      if supported is None or key in supported)
+
+        for key, values in (filters or dict()).items():
+            result.setdefault(key, list()).extend(values if isinstance(values, list) else [values])
+
+        return result
+
+    def _list_containers(self, snapshot=True, **kwargs):
+        if snapshot:
+            # reuse the unchanged models of the previous listing with the same arguments
+            snapshot_key = repr(sorted(kwargs.items()))
+            previous, current = self._container_snapshots.get(snapshot_key, dict()), dict()
+
+        else:
+            previous, current = None, None
 
-    def containers(self, **kwargs):
         with containers_histogram.labels('1' if kwargs.get('all') else '0').time():
-            return ContainerList(ContainerInfo(c) for c in self.client.containers.list(**kwargs))
+            if self.concurrency > 1:
+                containers = self._list_containers_concurrently(previous, current, not snapshot, **kwargs)
+
+            else:
+                containers = ContainerList(self._container_info(c, previous, current, keep_raw=not snapshot)
+                                           for c in self.client.containers.list(**kwargs))
+
+        if snapshot:
+            self._container_snapshots[snapshot_key] = current
 
-    def services(self, desired_task_state='running', **kwargs):
+        return containers
+
+    def _list_containers_concurrently(self, previous, current, keep_raw, **kwargs):
+        if self._pool is None:
+            self._pool = ThreadPool(self.concurrency)
+
+        # list the IDs only, then inspect the containers in parallel
+        container_ids = list(c['Id'] for c in self.client.api.containers(**kwargs))
+        inspect = partial(self._inspect_container, previous=previous, current=current, keep_raw=keep_raw)
+
+        return ContainerList(c for c in self._pool.map(inspect, container_ids) if c is not None)
+
+    def _inspect_container(self, container_id, previous=None, current=None, keep_raw=False):
+        try:
+            return self._container_info(self.client.containers.get(container_id), previous, current, keep_raw)
+
+        except NotFound:
+            return None
+
+    def _container_info(self, container, previous=None, current=None, keep_raw=False):
+        fingerprint = ContainerInfo.fingerprint(container)
+
+        if previous and previous.get(container.id, (None, None))[0] == fingerprint:
+            info = previous[container.id][1]
+
+            if not self.lazy_raw:
+                # compute the pending fields from the previous details first, so they can be released,
+                # then keep the latest details for the templates using them
+                info.materialize()
+                dict.__setitem__(info, 'raw', container)
+
+        else:
+            info = ContainerInfo(container)
+
+            if self.lazy_raw and not keep_raw:
+                detach_raw(info, self.client.containers.get)
+
+        if current is not None:
+            current[container.id] = (fingerprint, info)
+
+        return info
+
+    def _refresh_container(self, container_id):
+        if self.filters:
+            # check if the container still matches the filters
+            if not self.client.api.containers(all=True, filters=self._with_filters({'id': container_id})):
+                return None
+
+        return self._inspect_container(container_id)
+
+    def services(self, desired_task_state='running', filtered=True, **kwargs):
         if self.is_swarm_mode:
+            if filtered and self.filters:
+                kwargs['filters'] = self._with_filters(kwargs.get('filters'), self.SERVICE_FILTERS)
+
             with services_histogram.labels(desired_task_state).time():
-                return ServiceList(ServiceInfo(s, desired_task_state=desired_task_state)
-                                   for s in self.client.services.list(**kwargs))
+                services = self.client.services.list(**kwargs)
+                tasks = self._tasks_by_service(desired_task_state, services, bool(kwargs.get('filters')))
+
+                # the unfiltered listings of the actions keep the services they already fetched
+                return ServiceList(self._service_info(s, ServiceInfo.task_list(s, tasks.get(s.id, list())),
+                                                      keep_raw=not filtered)
+                                   for s in services)
 
         else:
             return ServiceList()
 
+    def _services_with_all_tasks(self, **kwargs):
+        services, all_services = ServiceList(), ServiceList()
+
+        if not self.is_swarm_mode:
+            return services, all_services
+
+        if self.filters:
+            kwargs['filters'] = self._with_filters(kwargs.get('filters'), self.SERVICE_FILTERS)
+
+        with services_histogram.labels('').time():
+            service_list = self.client.services.list(**kwargs)
+            tasks = self._tasks_by_service('', service_list, bool(kwargs.get('filters')))
+
+            for service in service_list:
+                all_tasks = ServiceInfo.task_list(service, tasks.get(service.id, list()))
+                running_tasks = TaskList(t for t in all_tasks if t.desired_state == 'running')
+
+                # the views share the same TaskInfo objects
+                all_services.append(self._service_info(service, all_tasks))
+                services.append(self._service_info(service, running_tasks))
+
+        return services, all_services
+
+    def _service_info(self, service, tasks, keep_raw=False):
+        info = ServiceInfo(service, tasks=tasks)
+
+        if self.lazy_raw and not keep_raw:
+            detach_raw(info, self.client.services.get)
+
+            for task in tasks:
+                detach_raw(task, self.client.api.inspect_task)
+
+        return info
+
+    def _tasks_by_service(self, desired_task_state, services, filtered):
+        task_filters = dict()
+
+        if desired_task_state:
+            task_filters['desired-state'] = desired_task_state
+
+        if filtered:
+            if not services:
+                return dict()
+
+            # only fetch the tasks of the selected services
+            task_filters['service'] = list(s.id for s in services)
+
+        tasks = dict()
+
+        # fetch the tasks of every service with a single API call
+        for task in self.client.api.tasks(filters=task_filters or None):
+            tasks.setdefault(task['ServiceID'], list()).append(task)
+
+        return tasks
+
     def nodes(self, **kwargs):
         if self.is_swarm_mode:
-            with nodes_histogram.time():
-                return ResourceList(NodeInfo(n) for n in self.client.nodes.list(**kwargs))
+            if self.node_cache and not kwargs:
+                return self.node_cache.items()
+
+            return self._list_nodes(**kwargs)
 
         else:
             return ResourceList()
 
+    def _list_nodes(self, **kwargs):
+        with nodes_histogram.time():
+            return ResourceList(self._node_info(n) for n in self.client.nodes.list(**kwargs))
+
+    def _inspect_node(self, node_id):
+        try:
+            return self._node_info(self.client.nodes.get(node_id))
+
+        except NotFound:
+            return None
+
+    def _node_info(self, node):
+        info = NodeInfo(node)
+
+        if self.lazy_raw:
+            detach_raw(info, self.client.nodes.get)
+
+        return info
+
     @property
     def state(self):
-        return EnhancedDict(containers=self.containers(),
-                            services=self.services(),
-                            all_containers=Lazy(self.containers, all=True),
-                            all_services=Lazy(self.services, desired_task_state=''),
+        if self.single_fetch:
+            all_containers = self.containers(all=True)
+            containers = all_containers.running
+
+            services, all_services = self._services_with_all_tasks()
+
+        else:
+            containers = self.containers()
+            all_containers = Lazy(self.containers, all=True)
+
+            services = self.services()
+            all_services = Lazy(self.services, desired_task_state='')
+
+        return EnhancedDict(containers=containers,
+                            services=services,
+                            all_containers=all_containers,
+                            all_services=all_services,
                             nodes=Lazy(self.nodes))
 
-    def events(self, **kwargs):
+    def events(self, watched=None, **kwargs):
+        if watched and 'filters' not in kwargs:
+            kwargs['filters'] = self.event_filters(watched)
+
         for event in self.client.events(**kwargs):
+            if isinstance(event, dict):
+                self._handle_event(event)
+
             yield event
 
+    def event_filters(self, watched):
+        # health_status comes as 'health_status: healthy' for example
+        actions = set(event.split(':')[0] for event in watched)
+
+        if actions.issubset(self.CONTAINER_ACTIONS):
+            types = {'container'}
+
+        else:
+            types = None  # the actions could belong to any type of object
+
+        if self.container_cache:
+            actions.update(self.container_cache.watched_actions)
+
+            for event_type, related_actions in self.container_cache.related_events.items():
+                actions.update(related_actions)
+
+                if types:
+                    types.add(event_type)
+
+        # node events can change the Swarm membership
+        actions.update(NodeCache.watched_actions)
+
+        filters = {'event': sorted(actions)}
+
+        if types:
+            types.add('node')
+
+            filters['type'] = sorted(types)
+
+        # the label filters are not applied to the events,
+        # the node events that change the Swarm membership do not carry them
+        return filters
+
+    def _handle_event(self, event):
+        if event.get('Type') in ('swarm', 'node'):
+            # the Swarm membership might have changed
+            self._swarm_mode = None
+
+        if self.container_cache:
+            self.container_cache.handle_event(event)
+
+        if self.node_cache:
+            self.node_cache.handle_event(event)
+
     def run_action(self, action_type, *args, **kwargs):
         action = action_type(self, swarm_manager=kwargs.get('manager'))
         action.execute(*args)
 
     def close(self):
+        if self._pool is not None:
+            self._pool.terminate()
+            self._pool = None
+
         self.client.api.close()
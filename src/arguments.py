@@ -2,6 +2,13 @@ import argparse
 import sys
 
 
+def filter_argument(value):
+    if '=' not in value:
+        raise argparse.ArgumentTypeError('Invalid filter, use the <KEY>=<VALUE> format: %s' % value)
+
+    return tuple(value.split('=', 1))
+
+
 def parse_arguments(args=sys.argv[1:]):
     parser = argparse.ArgumentParser(description='Template generator based on Docker runtime information')
 
@@ -37,6 +44,13 @@ def parse_arguments(args=sys.argv[1:]):
                         help='Docker events to watch and trigger updates for '
                              '(default: start, stop, die, health_status)')
 
+    parser.add_argument('--max-replay',
+                        metavar='<SECONDS>', required=False, default=60, type=float,
+                        help='Maximum number of seconds of missed Docker events to replay '
+                             'after reconnecting to the event stream, '
+                             'the target is updated from scratch instead after longer gaps '
+                             '(default: 60)')
+
     parser.add_argument('--swarm-manager',
                         required=False, action='store_true',
                         help='Enable the Swarm manager HTTP endpoint on port 9411')
@@ -61,6 +75,39 @@ def parse_arguments(args=sys.argv[1:]):
                         metavar='<ADDRESS>', required=False,
                         help='Alternative address (URL) for the Docker daemon connection')
 
+    parser.add_argument('--filter',
+                        metavar='<KEY>=<VALUE>', required=False, action='append', default=list(),
+                        type=filter_argument,
+                        help='Only list containers and services matching the filter on the Docker API, '
+                             'for example: label=virtual-host (actions are not affected)')
+
+    parser.add_argument('--container-cache',
+                        required=False, action='store_true',
+                        help='Keep the containers in memory and update them from Docker events '
+                             'instead of listing all of them on every update')
+
+    parser.add_argument('--concurrency',
+                        metavar='<COUNT>', required=False, type=int, default=4,
+                        help='Maximum number of concurrent requests for inspecting containers '
+                             '(default: 4)')
+
+    parser.add_argument('--single-fetch',
+                        required=False, action='store_true',
+                        help='Fetch all containers and Swarm tasks once on updates and derive the running ones '
+                             'from them (useful when templates use both containers and all_containers '
+                             'or services and all_services)')
+
+    parser.add_argument('--node-cache-ttl',
+                        metavar='<SECONDS>', required=False, type=float, default=0,
+                        help='Keep the Swarm nodes in memory, update them from Docker events '
+                             'and reload all of them after the given number of seconds '
+                             '(default: 0 meaning the nodes are not cached)')
+
+    parser.add_argument('--lazy-raw',
+                        required=False, action='store_true',
+                        help='Only keep the parsed fields of containers, services and nodes in memory '
+                             'and fetch the raw Docker objects when an action or a template uses them')
+
     parser.add_argument('--metrics',
                         metavar='<PORT>', required=False, type=int, default=9413,
                         help='HTTP port number for exposing Prometheus metrics (default: 9413)')
@@ -0,0 +1,152 @@
+import threading
+import time
+
+from resources import ContainerList, ResourceList
+from utils import get_logger
+
+logger = get_logger('pygen-cache')
+
+
+class ResourceCache(object):
+    resource_type = None
+    list_type = ResourceList
+
+    # events that change the inspected state of the resource
+    watched_actions = ('create', 'update', 'remove')
+    # events that do not change the inspected state of the resource
+    ignored_actions = tuple()
+    removal_actions = ('remove',)
+    # events of other types that change the resource, referenced by its ID in the attributes
+    related_events = dict()
+
+    # whether resources appearing later are listed first, like containers on the API
+    new_resources_first = False
+
+    def __init__(self, load, inspect, ttl=0):
+        self.load = load
+        self.inspect = inspect
+        self.ttl = ttl
+
+        self.lock = threading.Lock()
+        self.entries = None
+        self.loaded_at = None
+        self.sequence = 0
+
+    @property
+    def is_loaded(self):
+        return self.entries is not None
+
+    @property
+    def is_expired(self):
+        if self.loaded_at is None:
+            return True
+
+        return self.ttl > 0 and time.time() - self.loaded_at > self.ttl
+
+    def items(self):
+        with self.lock:
+            if self.entries is None or self.is_expired:
+                self._populate()
+
+            entries = sorted(self.entries.values(), key=lambda entry: entry[0])
+
+        return self.list_type(item for _, item in entries)
+
+    def _populate(self):
+        logger.debug('Loading all %ss into the cache', self.resource_type)
+
+        entries = dict()
+
+        # keep the order of the API
+        for index, item in enumerate(self.load()):
+            entries[item.id] = (index, item)
+
+        # only mark the cache loaded once the listing succeeded
+        self.entries = entries
+        self.loaded_at = time.time()
+        self.sequence = 0 if self.new_resources_first else len(entries)
+
+    def invalidate(self):
+        with self.lock:
+            self.entries = None
+
+    def handle_event(self, event):
+        if not self.is_loaded:
+            return
+
+        action = (event.get('Action') or event.get('status') or '').split(':')[0]
+        actor = event.get('Actor', dict())
+
+        if event.get('Type') == self.resource_type:
+            if action in self.ignored_actions:
+                return
+
+            resource_id = actor.get('ID') or event.get('id')
+
+        elif action in self.related_events.get(event.get('Type'), tuple()):
+            resource_id = actor.get('Attributes', dict()).get(self.resource_type)
+
+        else:
+            return
+
+        if not resource_id:
+            return
+
+        if action in self.removal_actions:
+            item = None
+
+        else:
+            item = self.inspect(resource_id)
+
+        with self.lock:
+            if self.entries is None:
+                return
+
+            if item is None:
+                logger.debug('Removing %s %s from the cache', self.resource_type, resource_id)
+
+                self.entries.pop(resource_id, None)
+
+                return
+
+            if resource_id in self.entries:
+                position, _ = self.entries[resource_id]
+
+            elif self.new_resources_first:
+                self.sequence -= 1
+                position = self.sequence
+
+            else:
+                self.sequence += 1
+                position = self.sequence
+
+            logger.debug('Updating %s %s in the cache on %s event', self.resource_type, resource_id, action)
+
+            self.entries[resource_id] = (position, item)
+
+
+class ContainerCache(ResourceCache):
+    resource_type = 'container'
+    list_type = ContainerList
+
+    watched_actions = ('create', 'start', 'restart', 'die', 'stop', 'pause', 'unpause', 'oom',
+                       'rename', 'update', 'health_status', 'destroy')
+    ignored_actions = ('attach', 'detach', 'resize', 'top', 'export', 'commit', 'copy',
+                       'archive-path', 'extract-to-dir', 'exec_create', 'exec_start',
+                       'exec_detach', 'exec_die')
+    removal_actions = ('destroy',)
+    related_events = {'network': ('connect', 'disconnect')}
+
+    new_resources_first = True
+
+    def containers(self, all=False):
+        containers = self.items()
+
+        if all:
+            return containers
+
+        return containers.running
+
+
+class NodeCache(ResourceCache):
+    resource_type = 'node'
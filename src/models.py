@@ -1,31 +1,76 @@
 from resources import NetworkList, TaskList
-from utils import EnhancedDict, EnhancedList
+from utils import EnhancedDict, EnhancedList, LazyDict, Lazy, StringInterner
 
+# label and environment variable names and values, image names, etc. repeat across resources
+interned_keys = StringInterner(max_size=4096)
+interned_values = StringInterner(max_size=16384)
+
+# marks the ingress network ID of a service as not resolved yet, None means there is none
+_unresolved = object()
+
+
+def intern_items(items):
+    return ((interned_keys.intern(key), interned_values.intern(value)) for key, value in items)
+
+
+def detach_raw(info, loader):
+    if isinstance(dict.get(info, 'raw'), Lazy):
+        return info
+
+    # compute the lazy fields while the raw object is still available
+    if isinstance(info, LazyDict):
+        info.materialize()
+
+    info['raw'] = Lazy(loader, info.id)
+
+    return info
+
+
+class ContainerInfo(LazyDict):
+    __slots__ = ()
 
-class ContainerInfo(EnhancedDict):
     def __init__(self, container, **kwargs):
         super(ContainerInfo, self).__init__()
 
+        config = container.attrs['Config']
+
         info = {
             'raw': container,
             'id': container.id,
             'short_id': container.short_id,
             'name': container.name,
-            'image': container.attrs['Config'].get('Image'),
+            'image': interned_values.intern(container.attrs['Config'].get('Image')),
             'status': container.status,
-            'health': container.attrs['State'].get('Health', dict()).get('Status', 'unknown'),
-            'labels': EnhancedDict(container.labels).default(''),
-            'env': EnhancedDict(self.split_env(container.attrs['Config'].get('Env', list()))).default(''),
-            'networks': self._networks(container),
-            'ports': self._ports(container.attrs['Config'].get('ExposedPorts', dict()).keys())
+            'health': container.attrs['State'].get('Health', dict()).get('Status', 'unknown')
         }
 
         self.update(info)
+
+        # these are only computed when the template uses them
+        self.lazy('labels', lambda: EnhancedDict(intern_items(container.labels.items())).default(''))
+        self.lazy('env', lambda: EnhancedDict(self.split_env(config.get('Env', list()))).default(''))
+        self.lazy('networks', lambda: self._networks(container))
+        self.lazy('ports', lambda: self._ports(config.get('ExposedPorts', dict()).keys()))
+
         self.update(kwargs)
 
+    @staticmethod
+    def fingerprint(container):
+        # the rest of the fields can not change while the container exists
+        state = container.attrs['State']
+        networks = container.attrs['NetworkSettings']['Networks'] or dict()
+
+        return (
+            container.name,
+            state.get('Status'),
+            state.get('StartedAt'),
+            state.get('Health', dict()).get('Status'),
+            tuple(sorted((name, network['NetworkID'], network['IPAddress']) for name, network in networks.items()))
+        )
+
     @staticmethod
     def split_env(values):
-        return map(lambda x: x.split('=', 1), values) if values else dict()
+        return intern_items(value.split('=', 1) for value in values) if values else dict()
 
     @staticmethod
     def _networks(container):
@@ -35,7 +80,7 @@ class ContainerInfo(EnhancedDict):
 
         for name, network in settings['Networks'].items():
             result.append(EnhancedDict(
-                name=name,
+                name=interned_values.intern(name),
                 id=network['NetworkID'],
                 ip_address=network['IPAddress']
             ))
@@ -50,14 +95,16 @@ class ContainerInfo(EnhancedDict):
         )
 
     def __hash__(self):
-        return hash(self.raw)
+        return hash(self.id)
 
     def __eq__(self, other):
         return self.id == other.id
 
 
-class TaskInfo(EnhancedDict):
-    def __init__(self, service, task, **kwargs):
+class TaskInfo(LazyDict):
+    __slots__ = ()
+
+    def __init__(self, service, task, ingress_id=_unresolved, **kwargs):
         super(TaskInfo, self).__init__()
 
         info = {
@@ -71,36 +118,52 @@ class TaskInfo(EnhancedDict):
             'service_id': task['ServiceID'],
             'slot': task.get('Slot'),
             'container_id': task['Status'].get('ContainerStatus', dict()).get('ContainerID'),
-            'image': task['Spec']['ContainerSpec']['Image'],
+            'image': interned_values.intern(task['Spec']['ContainerSpec']['Image']),
             'status': task['Status']['State'],
-            'desired_state': task['DesiredState'],
-            'labels': EnhancedDict(task['Spec']['ContainerSpec'].get('Labels', dict())).default(''),
-            'env': EnhancedDict(ContainerInfo.split_env(task['Spec']['ContainerSpec'].get('Env', list()))).default(''),
-            'networks': NetworkList(self.parse_network(network) for network in task.get('NetworksAttachments', list()))
+            'desired_state': task['DesiredState']
         }
 
-        info['labels'].update({
+        self.update(info)
+
+        # these are only computed when the template uses them
+        self.lazy('labels', lambda: self._labels(service, task))
+        self.lazy('env', lambda: EnhancedDict(
+            ContainerInfo.split_env(task['Spec']['ContainerSpec'].get('Env', list()))).default(''))
+        self.lazy('networks', lambda: self._networks(service, task, ingress_id))
+
+        self.update(kwargs)
+
+    def _labels(self, service, task):
+        labels = EnhancedDict(intern_items(task['Spec']['ContainerSpec'].get('Labels', dict()).items())).default('')
+
+        labels.update({
             'com.docker.swarm.service.id': service.id,
             'com.docker.swarm.service.name': service.name,
-            'com.docker.swarm.task.id': info['id'],
-            'com.docker.swarm.task.name': info['name'],
-            'com.docker.swarm.node.id': info['node_id']
+            'com.docker.swarm.task.id': self.id,
+            'com.docker.swarm.task.name': self.name,
+            'com.docker.swarm.node.id': self.node_id
         })
 
-        self.update(info)
-        self.update(kwargs)
+        return labels
+
+    def _networks(self, service, task, ingress_id):
+        if ingress_id is _unresolved:
+            ingress_id = ServiceInfo.probable_ingress_id(service)
+
+        return NetworkList(self.parse_network(network, ingress_id)
+                           for network in task.get('NetworksAttachments', list()))
 
     @staticmethod
-    def parse_network(network):
+    def parse_network(network, ingress_id=None):
         details = network['Network']
         spec = details['Spec']
         addresses = network['Addresses']
 
         return EnhancedDict(
             id=details['ID'],
-            name=spec['Name'],
-            is_ingress=spec.get('Ingress') is True,
-            labels=EnhancedDict(spec.get('Labels', dict())),
+            name=interned_values.intern(spec['Name']),
+            is_ingress=spec.get('Ingress') is True or details['ID'] == ingress_id,
+            labels=EnhancedDict(intern_items(spec.get('Labels', dict()).items())),
             ip_addresses=EnhancedList(address.split('/')[0] for address in addresses)
         )
 
@@ -111,8 +174,12 @@ class TaskInfo(EnhancedDict):
         return self.id == other.id
 
 
-class ServiceInfo(EnhancedDict):
-    def __init__(self, service, desired_task_state='running', **kwargs):
+class ServiceInfo(LazyDict):
+    __slots__ = ()
+
+    ENDPOINT_KEYS = ('ports', 'networks', 'ingress')
+
+    def __init__(self, service, desired_task_state='running', tasks=None, **kwargs):
         super(ServiceInfo, self).__init__()
 
         info = {
@@ -121,50 +188,94 @@ class ServiceInfo(EnhancedDict):
             'short_id': service.short_id,
             'name': service.name,
             'version': service.attrs['Version']['Index'],
-            'image': service.attrs['Spec']['TaskTemplate']['ContainerSpec']['Image'],
-            'labels': EnhancedDict(service.attrs['Spec'].get('Labels', dict())).default(''),
-            'ports': EnhancedDict(tcp=EnhancedList(), udp=EnhancedList()),
-            'networks': NetworkList(),
-            'ingress': EnhancedDict(ports=EnhancedDict(tcp=EnhancedList(), udp=EnhancedList()),
-                                    gateway='',
-                                    ip_addresses=EnhancedList())
+            'image': interned_values.intern(service.attrs['Spec']['TaskTemplate']['ContainerSpec']['Image']),
+            'labels': EnhancedDict(intern_items(service.attrs['Spec'].get('Labels', dict()).items())).default('')
         }
 
-        if desired_task_state:
-            task_filters = {'desired-state': desired_task_state}
+        if tasks is None:
+            if desired_task_state:
+                task_filters = {'desired-state': desired_task_state}
 
-        else:
-            task_filters = None
+            else:
+                task_filters = None
 
-        info['tasks'] = TaskList(TaskInfo(service, task)
-                                 for task in service.tasks(filters=task_filters))
+            tasks = self.task_list(service, service.tasks(filters=task_filters))
+
+        info['tasks'] = tasks
 
         self.update(info)
 
-        self.process_ingress()
+        # these are only computed when the template uses them
+        for key in self.ENDPOINT_KEYS:
+            self.lazy(key, lambda key=key: self._process_endpoints(key))
+
+        self.update(kwargs)
+
+    def _process_endpoints(self, key):
+        # keep the values given explicitly
+        overrides = dict((k, dict.get(self, k)) for k in self.ENDPOINT_KEYS if dict.__contains__(self, k))
+
+        self.update(
+            ports=EnhancedDict(tcp=EnhancedList(), udp=EnhancedList()),
+            networks=NetworkList(),
+            ingress=EnhancedDict(ports=EnhancedDict(tcp=EnhancedList(), udp=EnhancedList()),
+                                 gateway='',
+                                 ip_addresses=EnhancedList())
+        )
+
         self.process_networks()
         self.process_ports()
 
-        self.update(kwargs)
+        self.update(overrides)
 
-    def process_ingress(self):
-        virtual_ips = self.raw.attrs['Endpoint'].get('VirtualIPs', list())
+        return self[key]
 
-        # for older API versions
-        probably_ingress = None
+    @staticmethod
+    def task_list(service, tasks):
+        # the ingress network is the same for all tasks of the service
+        ingress_id = ServiceInfo.probable_ingress_id(service)
+
+        return TaskList(TaskInfo(service, task, ingress_id=ingress_id) for task in tasks)
+
+    @staticmethod
+    def target_network_ids(service):
         target_network_ids = set()
         target_network_ids.update(
-            network['Target'] for network in self.raw.attrs['Spec'].get('TaskTemplate', dict()).get('Networks', list()))
+            network['Target'] for network in service.attrs['Spec'].get('TaskTemplate', dict()).get('Networks', list()))
         target_network_ids.update(
-            network['Target'] for network in self.raw.attrs['Spec'].get('Networks', list()))
+            network['Target'] for network in service.attrs['Spec'].get('Networks', list()))
+
+        return target_network_ids
+
+    @staticmethod
+    def probable_ingress_id(service):
+        virtual_ips = service.attrs['Endpoint'].get('VirtualIPs', list())
+
+        # for older API versions
+        probably_ingress = None
+        target_network_ids = ServiceInfo.target_network_ids(service)
 
         for vip in virtual_ips:
             if vip['NetworkID'] not in target_network_ids:
                 probably_ingress = vip['NetworkID']
 
+        return probably_ingress
+
+    def process_networks(self):
+        # the first and the last virtual IP on each network, like the scans used before
+        first_vips, last_vips = dict(), dict()
+
+        for vip in self.raw.attrs['Endpoint'].get('VirtualIPs', list()):
+            first_vips.setdefault(vip['NetworkID'], vip)
+            last_vips[vip['NetworkID']] = vip
+
+        names, ip_addresses = dict(), dict()
+
+        # collect the details of all networks in a single pass over the tasks
         for task in self.tasks:
             for task_network in task.networks:
-                if task_network.is_ingress or task_network.id == probably_ingress:
+                # task networks are flagged as ingress using the virtual IPs of the service
+                if task_network.is_ingress:
                     self.ingress.update(
                         id=task_network.id,
                         name=task_network.name
@@ -172,45 +283,20 @@ class ServiceInfo(EnhancedDict):
 
                     self.ingress.ip_addresses.extend(task_network.ip_addresses)
 
-                if probably_ingress and task_network.id == probably_ingress:
-                    task_network.is_ingress = True
+                names[task_network.id] = task_network.name
+                ip_addresses.setdefault(task_network.id, EnhancedList()).extend(task_network.ip_addresses)
 
-        for vip in virtual_ips:
-            if vip['NetworkID'] == self.ingress.id:
-                self.ingress.gateway = vip['Addr'].split('/')[0]
+        if self.ingress.id in last_vips:
+            self.ingress['gateway'] = last_vips[self.ingress.id]['Addr'].split('/')[0]
 
-    def process_networks(self):
-        virtual_ips = self.raw.attrs['Endpoint'].get('VirtualIPs', list())
-
-        raw_network_ids = set()
-        raw_network_ids.update(
-            network['Target'] for network in self.raw.attrs['Spec'].get('TaskTemplate', dict()).get('Networks', list()))
-        raw_network_ids.update(
-            network['Target'] for network in self.raw.attrs['Spec'].get('Networks', list()))
-
-        for network_id in raw_network_ids:
-            gateway = None
-            name = None
-            ip_addresses = EnhancedList()
-
-            # get an address for it
-            for vip in virtual_ips:
-                if vip['NetworkID'] == network_id:
-                    gateway = vip['Addr'].split('/')[0]
-                    break
-
-            # process network details based on task information
-            for task in self.tasks:
-                for task_network in task.networks:
-                    if task_network.id == network_id:
-                        name = task_network.name
-                        ip_addresses.extend(task_network.ip_addresses)
+        for network_id in self.target_network_ids(self.raw):
+            vip = first_vips.get(network_id)
 
             self.networks.append(EnhancedDict(
                 id=network_id,
-                name=name,
-                gateway=gateway,
-                ip_addresses=ip_addresses
+                name=names.get(network_id),
+                gateway=vip['Addr'].split('/')[0] if vip else None,
+                ip_addresses=ip_addresses.get(network_id, EnhancedList())
             ))
 
     def process_ports(self):
@@ -223,13 +309,15 @@ class ServiceInfo(EnhancedDict):
             self.ports[protocol].append(target)
 
     def __hash__(self):
-        return hash(self.raw)
+        return hash(self.id)
 
     def __eq__(self, other):
         return self.id == other.id
 
 
 class NodeInfo(EnhancedDict):
+    __slots__ = ()
+
     def __init__(self, node, **kwargs):
         super(NodeInfo, self).__init__()
 
@@ -244,7 +332,7 @@ class NodeInfo(EnhancedDict):
             'hostname': node.attrs.get('Description', dict()).get('Hostname', ''),
             'role': node.attrs['Spec']['Role'],
             'availability': node.attrs['Spec']['Availability'],
-            'labels': EnhancedDict(node.attrs['Spec'].get('Labels', dict())).default(''),
+            'labels': EnhancedDict(intern_items(node.attrs['Spec'].get('Labels', dict()).items())).default(''),
             'platform': EnhancedDict(node.attrs.get('Description', dict()).get('Platform', dict())),
             'engine_version': node.attrs.get('Description', dict()).get('Engine', dict()).get('EngineVersion', ''),
         }
@@ -256,7 +344,7 @@ class NodeInfo(EnhancedDict):
         self.update(kwargs)
 
     def __hash__(self):
-        return hash(self.raw)
+        return hash(self.id)
 
     def __eq__(self, other):
         return self.id == other.id
@@ -1,5 +1,6 @@
 import re
 import threading
+import time
 
 from actions import RestartAction, SignalAction
 from api import *
@@ -8,7 +9,7 @@ from http_manager import Manager
 from metrics import MetricsServer, Summary, Counter
 from templates import initialize_template, get_template_variables
 from timer import NotificationTimer
-from utils import get_logger
+from utils import get_logger, refresh_current_container_id
 
 logger = get_logger('pygen')
 
@@ -31,6 +32,9 @@ class PyGen(object):
     DEFAULT_INTERVALS = [0.5, 2]
     DEFAULT_REPEAT_INTERVAL = 0
     DEFAULT_EVENTS = ['start', 'stop', 'die', 'health_status']
+    DEFAULT_CONCURRENCY = 4
+    DEFAULT_MAX_REPLAY = 60
+    MAX_RECONNECT_INTERVAL = 30
 
     def __init__(self, **kwargs):
         self.target_path = kwargs.get('target')
@@ -39,7 +43,10 @@ class PyGen(object):
         self.signal_targets = kwargs.get('signal', self.EMPTY_LIST)
         self.events = kwargs.get('events', self.DEFAULT_EVENTS)
         self.one_shot = kwargs.get('one_shot', False)
+        self.max_replay = kwargs.get('max_replay', self.DEFAULT_MAX_REPLAY)
+        self.reconnect_interval = 1
         self.update_lock = threading.Lock()
+        self.first_update_at = None
 
         logger.debug('Targets to restart on changes: [%s]',
                      ', '.join(self.restart_targets))
@@ -87,10 +94,18 @@ class PyGen(object):
         else:
             self.repeat_timer = None
 
-        self.api = DockerApi(kwargs.get('docker_address'))
+        self.api = DockerApi(kwargs.get('docker_address'),
+                             container_cache=kwargs.get('container_cache', False),
+                             concurrency=kwargs.get('concurrency', self.DEFAULT_CONCURRENCY),
+                             single_fetch=kwargs.get('single_fetch', False),
+                             node_cache_ttl=kwargs.get('node_cache_ttl', 0),
+                             filters=self.parse_filters(kwargs.get('filter', self.EMPTY_LIST)),
+                             lazy_raw=kwargs.get('lazy_raw', False))
 
         logger.debug('Successfully connected to the Docker API')
 
+        logger.debug('Running in container: %s', refresh_current_container_id())
+
         if kwargs.get('swarm_manager', False):
             if self.one_shot:
                 raise PyGenException('Swarm manager is not available in one-shot mode')
@@ -110,6 +125,15 @@ class PyGen(object):
 
         logger.debug('Metrics are exposed on port %s' % metrics_port)
 
+    @staticmethod
+    def parse_filters(values):
+        filters = dict()
+
+        for key, value in values:
+            filters.setdefault(key, list()).append(value)
+
+        return filters
+
     @generation_summary.time()
     def generate(self):
         state = self.api.state
@@ -124,6 +148,9 @@ class PyGen(object):
         return self.template.render(**template_args)
 
     def update_target(self, allow_repeat=False):
+        if self.first_update_at is None:
+            self.first_update_at = int(time.time())
+
         try:
             # update as soon as the event arrives
             self._update_target()
@@ -206,10 +233,83 @@ class PyGen(object):
 
     def read_events(self, **kwargs):
         kwargs['decode'] = True
+        kwargs['watched'] = self.events
+
+        if 'since' not in kwargs and self.first_update_at is not None:
+            # replay the events that happened while the target was generated the first time
+            kwargs['since'] = self.first_update_at
+
+        last_time = None
+        seen_at_last_time = set()
+        failed_attempts = 0
+        disconnected_at = None
+
+        while True:
+            connected_at = time.time()
+
+            try:
+                for event in self.api.events(**kwargs):
+                    failed_attempts = 0
+                    disconnected_at = None
+
+                    event_time = event.get('time')
+
+                    if event_time is not None:
+                        # skip events already processed before reconnecting
+                        key = (event_time,
+                               event.get('id') or event.get('Actor', self.EMPTY_DICT).get('ID'),
+                               event.get('status') or event.get('Action'))
+
+                        if last_time is not None and event_time < last_time:
+                            continue
+
+                        if event_time != last_time:
+                            last_time = event_time
+                            seen_at_last_time.clear()
+
+                        elif key in seen_at_last_time:
+                            continue
+
+                        seen_at_last_time.add(key)
+
+                    if self.is_watched(event):
+                        yield event
+
+                if kwargs.get('until'):
+                    return
+
+                logger.warning('The Docker event stream has ended')
+
+            except Exception as ex:
+                logger.error('Failed to read Docker events: %s', ex, exc_info=1)
+
+            failed_at = time.time()
+
+            # a stream that stayed open for a while was connected, the outage starts now
+            if disconnected_at is None or failed_at - connected_at > self.MAX_RECONNECT_INTERVAL:
+                disconnected_at = failed_at
+
+            failed_attempts += 1
+
+            time.sleep(min(self.reconnect_interval * 2 ** (failed_attempts - 1), self.MAX_RECONNECT_INTERVAL))
+
+            if last_time is None:
+                last_time = kwargs.get('since') or int(connected_at)
+
+            if time.time() - disconnected_at > self.max_replay:
+                logger.info('Missed events for more than %d seconds, updating the target', self.max_replay)
+
+                last_time = int(time.time())
+                seen_at_last_time.clear()
+                disconnected_at = None
+
+                self.api.refresh()
+                self.update_target()
+
+            else:
+                logger.info('Reconnecting to the Docker event stream from %d', last_time)
 
-        for event in self.api.events(**kwargs):
-            if self.is_watched(event):
-                yield event
+            kwargs['since'] = last_time
 
     def is_watched(self, event):
         if event.get('status') in self.events:
@@ -1,18 +1,160 @@
+from bisect import bisect_left
+from collections import OrderedDict
+
 import six
 
-from docker_helper import get_current_container_id
+from utils import EnhancedList, get_current_container_id
+
+
+def stack_service_name(service_name, namespace):
+    prefix = '%s_' % namespace
+
+    if service_name.startswith(prefix):
+        return service_name[len(prefix):]
+
+
+def resolve_attribute(resource, attribute_path):
+    value = resource
+
+    # like attribute lookups in templates: items first, then attributes
+    for part in attribute_path.split('.'):
+        try:
+            value = value[part]
 
-from utils import EnhancedList
+        except (KeyError, IndexError, TypeError):
+            value = getattr(value, part, None)
+
+    return value
+
+
+def _invalidating(name):
+    method = getattr(list, name)
+
+    def invalidate_and_call(self, *args, **kwargs):
+        self._indexes = None
+        return method(self, *args, **kwargs)
+
+    invalidate_and_call.__name__ = name
+
+    return invalidate_and_call
 
 
 class ResourceList(EnhancedList):
+    __slots__ = ('_indexes',)
+
+    def __init__(self, *args, **kwargs):
+        super(ResourceList, self).__init__(*args, **kwargs)
+
+        self._indexes = None
+
     def matching(self, target):
         return type(self)(self._unique_matching(target))
 
     def not_matching(self, target):
-        return type(self)(resource
-                          for resource in self
-                          if resource not in self.matching(target))
+        matching_ids = set(resource.id for resource in self._unique_matching(target))
+
+        return type(self)(resource for resource in self if resource.id not in matching_ids)
+
+    def where(self, label=None, env=None, network=None, health=None, status=None):
+        queries = (
+            ('label', self._label_keys, label and self._key_value_query(label)),
+            ('env', self._env_keys, env and self._key_value_query(env)),
+            ('network', self._network_keys, network),
+            ('health', self._health_keys, health and health.lower()),
+            ('status', self._status_keys, status and status.lower())
+        )
+
+        positions = None
+
+        for name, keys, value in queries:
+            if not value:
+                continue
+
+            found = self._index(name, lambda: self._build_index(keys)).get(value, ())
+
+            if positions is None:
+                positions = set(found)
+
+            else:
+                positions.intersection_update(found)
+
+        if positions is None:
+            return type(self)(self)
+
+        return type(self)(self[position] for position in sorted(positions))
+
+    def group_by(self, attribute_path):
+        return self._index('group_by:%s' % attribute_path, lambda: self._build_groups(attribute_path))
+
+    def _build_groups(self, attribute_path):
+        groups = dict()
+
+        for resource in self:
+            groups.setdefault(resolve_attribute(resource, attribute_path), type(self)()).append(resource)
+
+        try:
+            keys = sorted(groups)
+
+        except TypeError:
+            keys = sorted(groups, key=repr)  # not comparable with each other
+
+        return OrderedDict((key, groups[key]) for key in keys)
+
+    def sharing_networks(self, target):
+        target_network_ids = NetworkList.ids_of(target)
+
+        if not target_network_ids:
+            return type(self)()
+
+        index = self._index('network', lambda: self._build_index(self._network_keys))
+
+        positions = set()
+
+        for network_id in target_network_ids:
+            positions.update(index.get(network_id, ()))
+
+        return type(self)(self[position] for position in sorted(positions))
+
+    @staticmethod
+    def _key_value_query(query):
+        # `key` selects the non-empty values, `key=value` the exact ones
+        return tuple(query.split('=', 1))
+
+    @staticmethod
+    def _label_keys(resource):
+        for key, value in (getattr(resource, 'labels', None) or dict()).items():
+            if value:
+                yield (key,)
+
+            yield (key, value)
+
+    @staticmethod
+    def _env_keys(resource):
+        for key, value in (getattr(resource, 'env', None) or dict()).items():
+            if value:
+                yield (key,)
+
+            yield (key, value)
+
+    @staticmethod
+    def _network_keys(resource):
+        for network in getattr(resource, 'networks', None) or list():
+            yield network.id
+            yield network.name
+
+    @staticmethod
+    def _health_keys(resource):
+        health = getattr(resource, 'health', None)
+
+        if hasattr(health, 'lower'):
+            yield health.lower()
+
+    @staticmethod
+    def _status_keys(resource):
+        status = getattr(resource, 'status', None)
+
+        if hasattr(status, 'lower'):
+            yield status.lower()
 
     def _unique_matching(self, target):
         yielded = set()
@@ -24,42 +166,123 @@ class ResourceList(EnhancedList):
 
     def _matching(self, target):
         if isinstance(target, six.string_types):
-            for resource in self:
-                if resource.id == target or resource.name == target:
-                    yield resource
+            for resource in self._lookup('resource', self._resource_keys, target):
+                yield resource
 
-                elif hasattr(resource, 'labels') and resource.labels and target == resource.labels.get('pygen.target'):
-                    yield resource
+            # try short IDs
+            for resource in self._lookup_prefix(target):
+                yield resource
 
-                elif hasattr(resource, 'env') and resource.env and target == resource.env.get('PYGEN_TARGET'):
-                    yield resource
+    @staticmethod
+    def _resource_keys(resource):
+        yield resource.id
+        yield getattr(resource, 'name', None)
 
-            # try short IDs
-            for resource in self:
-                if resource.id.startswith(target):
-                    yield resource
+        if hasattr(resource, 'labels') and resource.labels:
+            yield resource.labels.get('pygen.target')
+
+        if hasattr(resource, 'env') and resource.env:
+            yield resource.env.get('PYGEN_TARGET')
+
+    def _lookup(self, name, keys, target):
+        try:
+            positions = self._index(name, lambda: self._build_index(keys)).get(target, ())
+
+        except TypeError:
+            return  # unhashable targets can not be equal to any of the keys
+
+        for position in positions:
+            yield self[position]
+
+    def _lookup_prefix(self, prefix):
+        ids, positions = self._index('id_prefix', self._build_prefix_index)
+
+        matching_positions = list()
+
+        # the IDs starting with the prefix are next to each other in sorted order
+        for index in range(bisect_left(ids, prefix), len(ids)):
+            if not ids[index].startswith(prefix):
+                break
+
+            matching_positions.append(positions[index])
+
+        for position in sorted(matching_positions):
+            yield self[position]
+
+    def _index(self, name, build):
+        if self._indexes is None:
+            self._indexes = dict()
+
+        index = self._indexes.get(name)
+
+        if index is None:
+            index = self._indexes[name] = build()
+
+        return index
+
+    def _build_index(self, keys):
+        index = dict()
+
+        # positions are added in order, so lookups keep the order of the list
+        for position, resource in enumerate(self):
+            for key in keys(resource):
+                try:
+                    positions = index.setdefault(key, list())
+
+                except TypeError:
+                    continue
+
+                if not positions or positions[-1] != position:
+                    positions.append(position)
+
+        return index
+
+    def _build_prefix_index(self):
+        entries = sorted((resource.id, position) for position, resource in enumerate(self))
+
+        return list(resource_id for resource_id, _ in entries), list(position for _, position in entries)
+
+
+for _name in ('append', 'extend', 'insert', 'remove', 'pop', 'clear', 'sort', 'reverse',
+              '__setitem__', '__delitem__', '__iadd__', '__imul__', '__setslice__', '__delslice__'):
+    # the indexes are only valid until the list changes
+    if hasattr(list, _name):
+        setattr(ResourceList, _name, _invalidating(_name))
 
 
 class ContainerList(ResourceList):
+    __slots__ = ()
+
+    # statuses of the containers listed by the API without `all=True`
+    RUNNING_STATUSES = ('running', 'paused', 'restarting')
+
     def _matching(self, target):
         for matching_resource in super(ContainerList, self)._matching(target):
             yield matching_resource
 
-        for container in self:
-            # check compose services
-            if target == container.labels.get('com.docker.compose.service', ''):
-                yield container
+        for container in self._lookup('container', self._container_keys, target):
+            yield container
+
+    @staticmethod
+    def _container_keys(container):
+        # check compose services
+        yield container.labels.get('com.docker.compose.service', '')
+
+        # check swarm services
+        service_name = container.labels.get('com.docker.swarm.service.name')
 
-            # check swarm services
-            service_name = container.labels.get('com.docker.swarm.service.name')
+        if service_name:
+            yield service_name
 
-            if service_name:
-                if target == service_name:
-                    yield container
+            if 'com.docker.stack.namespace' in container.labels:
+                stack_service = stack_service_name(service_name, container.labels['com.docker.stack.namespace'])
 
-                if 'com.docker.stack.namespace' in container.labels:
-                    if service_name == '%s_%s' % (container.labels['com.docker.stack.namespace'], target):
-                        yield container
+                if stack_service is not None:
+                    yield stack_service
+
+    @property
+    def running(self):
+        return type(self)(container for container in self if container.status in self.RUNNING_STATUSES)
 
     @property
     def healthy(self):
@@ -83,46 +306,84 @@ class ContainerList(ResourceList):
 
 
 class ServiceList(ResourceList):
+    __slots__ = ()
+
     def _matching(self, target):
         for matching_resource in super(ServiceList, self)._matching(target):
             yield matching_resource
 
-        for service in self:
-            if 'com.docker.stack.namespace' in service.labels:
-                if service.name == '%s_%s' % (service.labels['com.docker.stack.namespace'], target):
-                    yield service
+        for service in self._lookup('service', self._service_keys, target):
+            yield service
+
+    @staticmethod
+    def _service_keys(service):
+        if 'com.docker.stack.namespace' in service.labels:
+            stack_service = stack_service_name(service.name, service.labels['com.docker.stack.namespace'])
+
+            if stack_service is not None:
+                yield stack_service
 
     @property
     def self(self):
         self_id = get_current_container_id()
 
+        if self_id:
+            return self.service_for_container(self_id)
+
+    def service_for_container(self, container_id):
+        task_and_service = self._container_tasks().get(container_id)
+
+        if task_and_service:
+            return task_and_service[1]
+
+    def task_for_container(self, container_id):
+        task_and_service = self._container_tasks().get(container_id)
+
+        if task_and_service:
+            return task_and_service[0]
+
+    def _container_tasks(self):
+        return self._index('container_tasks', self._build_container_tasks)
+
+    def _build_container_tasks(self):
+        container_tasks = dict()
+
         for service in self:
-            if service.tasks.matching(self_id):
-                return service
+            for task in service.tasks:
+                # the first service wins, like when checking them in order
+                if task.container_id and task.container_id not in container_tasks:
+                    container_tasks[task.container_id] = (task, service)
+
+        return container_tasks
 
 
 class TaskList(ResourceList):
+    __slots__ = ()
+
     def _matching(self, target):
         for matching_resource in super(TaskList, self)._matching(target):
             yield matching_resource
 
-        for task in self:
-            if target == task.container_id:
-                yield task
+        for task in self._lookup('task', self._task_keys, target):
+            yield task
+
+    @staticmethod
+    def _task_keys(task):
+        yield task.container_id
 
-            # check swarm services
-            if target == task.service_id:
-                yield task
+        # check swarm services
+        yield task.service_id
 
-            service_name = task.labels.get('com.docker.swarm.service.name')
+        service_name = task.labels.get('com.docker.swarm.service.name')
 
-            if service_name:
-                if target == service_name:
-                    yield task
+        if service_name:
+            yield service_name
 
-                if 'com.docker.stack.namespace' in task.labels:
-                    if service_name == '%s_%s' % (task.labels['com.docker.stack.namespace'], target):
-                        yield task
+            if 'com.docker.stack.namespace' in task.labels:
+                stack_service = stack_service_name(service_name, task.labels['com.docker.stack.namespace'])
+
+                if stack_service is not None:
+                    yield stack_service
 
     def with_status(self, status):
         return type(self)(task for task in self if task.status.lower() == status.lower())
@@ -136,22 +397,35 @@ class TaskList(ResourceList):
 
 
 class NetworkList(ResourceList):
+    __slots__ = ()
+
     def _matching(self, target):
         for matching_resource in super(NetworkList, self)._matching(target):
             yield matching_resource
 
-        if isinstance(target, NetworkList):
-            target_network_ids = set(n.id for n in target)
+        target_network_ids = self.ids_of(target)
 
-        elif hasattr(target, 'networks') and target.networks:
-            target_network_ids = set(n.id for n in target.networks)
-
-        elif hasattr(target, 'id'):
-            target_network_ids = {target.id}
-
-        else:
+        if not target_network_ids or self.ids.isdisjoint(target_network_ids):
             return
 
         for net in self:
             if net.id in target_network_ids:
                 yield net
+
+    @property
+    def ids(self):
+        return self._index('ids', lambda: frozenset(network.id for network in self))
+
+    @staticmethod
+    def ids_of(target):
+        if isinstance(target, NetworkList):
+            return target.ids
+
+        elif hasattr(target, 'networks') and target.networks:
+            if isinstance(target.networks, NetworkList):
+                return target.networks.ids
+
+            return frozenset(network.id for network in target.networks)
+
+        elif hasattr(target, 'id'):
+            return frozenset([target.id])
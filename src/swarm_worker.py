@@ -68,7 +68,7 @@ class Worker(HttpServer):
         self.api.run_action(action_type, *args)
 
     def watch_events(self):
-        for event in self.api.events(decode=True):
+        for event in self.api.events(watched=self.events, decode=True):
             if self.is_watched(event):
                 logger.info('Received %s event from %s',
                             event.get('status'),
@@ -5,7 +5,7 @@ import jinja2
 import requests
 import docker_helper
 
-from utils import get_logger
+from utils import get_logger, get_current_container_id
 
 logger = get_logger('pygen-templates')
 
@@ -67,7 +67,7 @@ def initialize_template(source, **kwargs):
 
 def get_template_variables():
     return {
-        'own_container_id': docker_helper.get_current_container_id(),
+        'own_container_id': get_current_container_id(),
         'read_config': docker_helper.read_configuration
     }
 
@@ -1,6 +1,10 @@
 import sys
 import signal
 import logging
+import threading
+
+import six
+import docker_helper
 
 
 def initialize_logging():
@@ -31,8 +35,30 @@ def handle_signal(num, _):  # pragma: no cover
         exit(1)
 
 
+# the ID of the container the app is running in, resolved once
+_current_container_id = None
+_current_container_id_resolved = False
+
+
+def get_current_container_id():
+    if not _current_container_id_resolved:
+        return refresh_current_container_id()
+
+    return _current_container_id
+
+
+def refresh_current_container_id():
+    global _current_container_id, _current_container_id_resolved
+
+    _current_container_id = docker_helper.get_current_container_id()
+    _current_container_id_resolved = True
+
+    return _current_container_id
+
+
 def update_on_sighup(app):
     def sighup_handler(*args):
+        refresh_current_container_id()
         app.update_target()
 
     signal.signal(signal.SIGHUP, sighup_handler)
@@ -46,10 +72,25 @@ def setup_signals(app):
 
 
 class EnhancedDict(dict):
-    default_value = None
+    # no per-instance __dict__, attributes not listed here are stored as keys
+    __slots__ = ('_default_value', '_lowercase_keys')
+
+    def __init__(self, *args, **kwargs):
+        super(EnhancedDict, self).__init__(*args, **kwargs)
+
+        self._default_value = None
+        self._lowercase_keys = None
+
+    @property
+    def default_value(self):
+        return self._default_value
+
+    @default_value.setter
+    def default_value(self, value):
+        self._default_value = value
 
     def default(self, value):
-        self.default_value = value
+        self._default_value = value
         return self
 
     def __getattr__(self, item):
@@ -57,12 +98,62 @@ class EnhancedDict(dict):
             return self[item]
 
         elif hasattr(item, 'lower'):
-            for key in self:
-                if hasattr(key, 'lower') and key.lower() == item.lower():
-                    return self[key]
+            key = self._lowercase_key(item)
+
+            if key is not None:
+                return self[key]
 
         return self.default_value
 
+    def _lowercase_key(self, item):
+        if self._lowercase_keys is None:
+            lowercase_keys = dict()
+
+            # the first key wins, like when comparing them in order
+            for key in self:
+                if hasattr(key, 'lower'):
+                    lowercase_keys.setdefault(key.lower(), key)
+
+            self._lowercase_keys = lowercase_keys
+
+        return self._lowercase_keys.get(item.lower())
+
+    def __setitem__(self, key, value):
+        self._lowercase_keys = None
+        super(EnhancedDict, self).__setitem__(key, value)
+
+    def __delitem__(self, key):
+        self._lowercase_keys = None
+        super(EnhancedDict, self).__delitem__(key)
+
+    def update(self, *args, **kwargs):
+        self._lowercase_keys = None
+        super(EnhancedDict, self).update(*args, **kwargs)
+
+    def setdefault(self, key, default=None):
+        self._lowercase_keys = None
+        return super(EnhancedDict, self).setdefault(key, default)
+
+    def pop(self, key, *args):
+        self._lowercase_keys = None
+        return super(EnhancedDict, self).pop(key, *args)
+
+    def popitem(self):
+        self._lowercase_keys = None
+        return super(EnhancedDict, self).popitem()
+
+    def clear(self):
+        self._lowercase_keys = None
+        super(EnhancedDict, self).clear()
+
+    def __setattr__(self, name, value):
+        # slots, properties and methods are real attributes, anything else is stored as a key
+        if hasattr(type(self), name):
+            super(EnhancedDict, self).__setattr__(name, value)
+
+        else:
+            self[name] = value
+
     def __hash__(self):
         if 'raw' in self:
             return hash(self.raw)
@@ -74,7 +165,169 @@ class EnhancedDict(dict):
             raise TypeError('unhashable dict content')
 
 
+class LazyDict(EnhancedDict):
+    __slots__ = ('_factories',)
+
+    # shared by all instances without pending values, never modified
+    _NO_FACTORIES = dict()
+
+    # guards computing the pending values, the models can be read from several threads
+    _lock = threading.RLock()
+
+    def __init__(self, *args, **kwargs):
+        super(LazyDict, self).__init__(*args, **kwargs)
+
+        self._factories = self._NO_FACTORIES
+
+    def lazy(self, key, factory):
+        if self._factories is self._NO_FACTORIES:
+            self._factories = dict()
+
+        dict.pop(self, key, None)
+        self._factories[key] = factory
+        self._lowercase_keys = None
+        return self
+
+    def _discard_factory(self, key):
+        factory = self._factories.pop(key, None)
+
+        if factory is not None and not self._factories:
+            self._factories = self._NO_FACTORIES
+
+        return factory
+
+    def materialize(self):
+        with self._lock:
+            pending = list(self._factories)
+
+        for key in pending:
+            self[key]
+
+        return self
+
+    def __missing__(self, key):
+        with self._lock:
+            if dict.__contains__(self, key):
+                # computed by another thread in the meantime
+                return dict.__getitem__(self, key)
+
+            factory = self._factories.get(key)
+
+            if factory is None:
+                raise KeyError(key)
+
+            # store the value before dropping the factory, so the key is never missing
+            value = factory()
+            dict.__setitem__(self, key, value)
+            self._discard_factory(key)
+            return value
+
+    def __contains__(self, key):
+        return dict.__contains__(self, key) or key in self._factories
+
+    def __setitem__(self, key, value):
+        self._discard_factory(key)
+        super(LazyDict, self).__setitem__(key, value)
+
+    def __delitem__(self, key):
+        if self._discard_factory(key) is None:
+            super(LazyDict, self).__delitem__(key)
+
+        else:
+            self._lowercase_keys = None
+
+    def update(self, *args, **kwargs):
+        values = dict(*args, **kwargs)
+
+        for key in values:
+            self._discard_factory(key)
+
+        super(LazyDict, self).update(values)
+
+    def get(self, key, default=None):
+        if key in self:
+            return self[key]
+
+        return default
+
+    def setdefault(self, key, default=None):
+        if key in self:
+            return self[key]
+
+        self[key] = default
+        return default
+
+    def pop(self, key, *args):
+        self.materialize()
+        return super(LazyDict, self).pop(key, *args)
+
+    def popitem(self):
+        self.materialize()
+        return super(LazyDict, self).popitem()
+
+    def keys(self):
+        with self._lock:
+            return list(dict.keys(self)) + list(self._factories)
+
+    def values(self):
+        return dict.values(self.materialize())
+
+    def items(self):
+        return dict.items(self.materialize())
+
+    def copy(self):
+        return dict(self.materialize())
+
+    def __iter__(self):
+        return iter(self.keys())
+
+    def __eq__(self, other):
+        return dict.__eq__(self.materialize(), other)
+
+    def __ne__(self, other):
+        return not self == other
+
+    # defining __eq__ would reset the inherited hash on Python 3
+    __hash__ = EnhancedDict.__hash__
+
+    if six.PY2:
+        def has_key(self, key):
+            return key in self
+
+        def iterkeys(self):
+            return iter(self.keys())
+
+        def itervalues(self):
+            return iter(self.values())
+
+        def iteritems(self):
+            return iter(self.items())
+
+        def viewkeys(self):
+            return dict.viewkeys(self.materialize())
+
+        def viewvalues(self):
+            return dict.viewvalues(self.materialize())
+
+        def viewitems(self):
+            return dict.viewitems(self.materialize())
+
+    def __len__(self):
+        with self._lock:
+            return dict.__len__(self) + len(self._factories)
+
+    def __bool__(self):
+        return len(self) > 0
+
+    __nonzero__ = __bool__
+
+    def __repr__(self):
+        return dict.__repr__(self.materialize())
+
+
 class EnhancedList(list):
+    __slots__ = ()
+
     @property
     def first(self):
         if len(self):
@@ -92,7 +345,33 @@ class EnhancedList(list):
             return self[-1]
 
 
+class StringInterner(object):
+    def __init__(self, max_size):
+        self.max_size = max_size
+        self.strings = dict()
+
+    def intern(self, value):
+        if not isinstance(value, six.string_types):
+            return value
+
+        interned = self.strings.get(value)
+
+        if interned is None:
+            if len(self.strings) >= self.max_size:
+                # start over instead of growing without limits
+                self.strings = dict()
+
+            interned = self.strings.setdefault(value, value)
+
+        return interned
+
+    def __len__(self):
+        return len(self.strings)
+
+
 class Lazy(object):
+    __slots__ = ('__delegate', '__args', '__kwargs', '_value')
+
     def __init__(self, delegate, *args, **kwargs):
         self.__delegate = delegate
         self.__args = args
@@ -0,0 +1,54 @@
+"""
+Measures the time of resource matching on lists of different sizes.
+
+Usage:
+    PYTHONPATH=src python tests/bench_matching.py [count ...]
+"""
+
+import sys
+import time
+
+from resources import ContainerList
+from utils import EnhancedDict
+
+
+def create_containers(count):
+    return ContainerList(
+        EnhancedDict(
+            id='%064x' % index,
+            name='container-%d' % index,
+            labels=EnhancedDict({'com.docker.compose.service': 'app-%d' % (index % 10)}),
+            env=EnhancedDict()
+        )
+        for index in range(count)
+    )
+
+
+def measure(function, repeat=5):
+    best = None
+
+    for _ in range(repeat):
+        started = time.time()
+        function()
+        elapsed = time.time() - started
+
+        if best is None or elapsed < best:
+            best = elapsed
+
+    return best
+
+
+def main():
+    counts = list(int(arg) for arg in sys.argv[1:]) or [1000, 2000, 5000, 10000]
+
+    for count in counts:
+        containers = create_containers(count)
+
+        matching = measure(lambda: containers.matching('app-1'))
+        not_matching = measure(lambda: containers.not_matching('app-1'))
+
+        print('%6d containers: matching %.4f seconds, not_matching %.4f seconds' % (count, matching, not_matching))
+
+
+if __name__ == '__main__':
+    main()
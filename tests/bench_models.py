@@ -0,0 +1,85 @@
+"""
+Measures the memory used by the models built for a number of containers.
+
+Usage:
+    PYTHONPATH=src python tests/bench_models.py [count] [--lazy-raw]
+"""
+
+import gc
+import sys
+import time
+import tracemalloc
+
+from fake_helper import FakeContainer
+from models import ContainerInfo, detach_raw
+from resources import ContainerList
+
+
+def fake_container(index):
+    return FakeContainer(
+        '%064x' % index, 'container-%d' % index, health='healthy',
+        env=['PATH=/usr/local/sbin:/usr/local/bin:/usr/sbin:/usr/bin:/sbin:/bin',
+             'VIRTUAL_HOST=app-%d.example.com' % index],
+        ports={'80/tcp': {}, '443/tcp': {}},
+        labels={
+            'com.docker.compose.project': 'bench',
+            'com.docker.compose.service': 'app-%d' % (index % 10),
+            'com.docker.compose.version': '1.18.0',
+            'pygen.target': 'target-%d' % (index % 100),
+            'traefik.enable': 'true',
+            'traefik.port': '80',
+            'traefik.frontend.rule': 'Host:app-%d.example.com' % (index % 10)
+        },
+        networks={
+            'frontend': {'NetworkID': 'a' * 64, 'IPAddress': '10.0.%d.%d' % (index // 250, index % 250)},
+            'backend': {'NetworkID': 'b' * 64, 'IPAddress': '10.1.%d.%d' % (index // 250, index % 250)}
+        })
+
+
+def fetch_container(container_id):
+    raise Exception('Not expected to fetch %s' % container_id)
+
+
+def measure(count, lazy_raw=False):
+    gc.collect()
+    tracemalloc.start()
+
+    started = time.time()
+
+    # the raw objects are only referenced by the models, like the ones listed on the API
+    containers = ContainerList(ContainerInfo(fake_container(index)) for index in range(count))
+
+    if lazy_raw:
+        for container in containers:
+            detach_raw(container, fetch_container)
+
+    # access everything the templates would use
+    for container in containers:
+        container.materialize()
+
+        for network in container.networks:
+            network.ip_address
+
+    elapsed = time.time() - started
+
+    gc.collect()
+    size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return size, elapsed
+
+
+def main():
+    arguments = list(arg for arg in sys.argv[1:] if not arg.startswith('--'))
+    lazy_raw = '--lazy-raw' in sys.argv
+
+    count = int(arguments[0]) if arguments else 10000
+
+    size, elapsed = measure(count, lazy_raw)
+
+    print('%d containers%s: %.2f MiB (%d bytes per container) in %.3f seconds' % (
+        count, ' (lazy raw)' if lazy_raw else '', size / 1024.0 / 1024.0, size // count, elapsed))
+
+
+if __name__ == '__main__':
+    main()
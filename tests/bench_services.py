@@ -0,0 +1,62 @@
+"""
+Measures the time of resolving the networks and ports of large Swarm services.
+
+Usage:
+    PYTHONPATH=src python tests/bench_services.py [replicas] [networks]
+"""
+
+import sys
+import time
+
+from fake_helper import FakeService, fake_task
+from models import ServiceInfo
+
+
+def fake_service(network_count):
+    return FakeService(
+        's%063d' % 1, 'bench',
+        networks=list('n%063d' % index for index in range(network_count)),
+        virtual_ips=[{'NetworkID': 'ingress', 'Addr': '10.255.0.2/16'}] + list(
+            {'NetworkID': 'n%063d' % index, 'Addr': '10.%d.0.2/16' % index} for index in range(network_count)),
+        ports=[{'Protocol': 'tcp', 'PublishedPort': 8080, 'TargetPort': 80}])
+
+
+def fake_service_task(service, slot, network_count):
+    networks = [('ingress', 'ingress', None, '10.255.%d.%d/16' % (slot // 250, slot % 250 + 3))] + list(
+        ('n%063d' % index, 'network-%d' % index, None, '10.%d.%d.%d/16' % (index, slot // 250, slot % 250 + 3))
+        for index in range(network_count))
+
+    return fake_task('t%063d' % slot, service.id, slot, networks=networks)
+
+
+def measure(replicas, network_count, repeat=20):
+    service = fake_service(network_count)
+    tasks = list(fake_service_task(service, slot, network_count) for slot in range(1, replicas + 1))
+
+    best = None
+
+    for _ in range(repeat):
+        started = time.time()
+
+        # includes parsing the networks of the tasks
+        ServiceInfo(service, tasks=ServiceInfo.task_list(service, tasks)).materialize()
+
+        elapsed = time.time() - started
+
+        if best is None or elapsed < best:
+            best = elapsed
+
+    return best
+
+
+def main():
+    replicas = int(sys.argv[1]) if len(sys.argv) > 1 else 100
+    network_count = int(sys.argv[2]) if len(sys.argv) > 2 else 5
+
+    elapsed = measure(replicas, network_count)
+
+    print('%d replicas on %d networks: %.3f ms' % (replicas, network_count, elapsed * 1000.0))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,221 @@
+import json
+
+from docker.errors import NotFound
+
+
+class FakeContainer(object):
+    def __init__(self, container_id, name, status='running', labels=None, env=None, networks=None, ports=None,
+                 health=None):
+        attrs = {
+            'Id': container_id,
+            'Name': '/%s' % name,
+            'Config': {
+                'Image': 'alpine',
+                'Env': ['KEY=value'] if env is None else env,
+                'ExposedPorts': ports or dict(),
+                'Labels': labels or dict()
+            },
+            'State': {'Status': status},
+            'NetworkSettings': {'Networks': networks or dict()}
+        }
+
+        if health:
+            attrs['State']['Health'] = {'Status': health}
+
+        # decode it like the responses of the Docker API, without sharing any strings
+        self.attrs = json.loads(json.dumps(attrs))
+
+        self.id = self.attrs['Id']
+        self.short_id = self.id[:10]
+        self.name = self.attrs['Name'].lstrip('/')
+        self.status = status
+        self.labels = self.attrs['Config']['Labels']
+
+
+def matches_filters(resource, filters):
+    for key, values in (filters or dict()).items():
+        for value in values if isinstance(values, list) else [values]:
+            if key == 'id' and resource.id != value:
+                return False
+
+            if key == 'label' and value not in resource.labels:
+                return False
+
+    return True
+
+
+class FakeContainers(object):
+    def __init__(self, client):
+        self.client = client
+        self.items = list()
+
+    def list(self, **kwargs):
+        self.client.calls.append(('list', kwargs))
+
+        return list(c for c in self.items
+                    if (kwargs.get('all') or c.status == 'running') and matches_filters(c, kwargs.get('filters')))
+
+    def get(self, container_id):
+        self.client.calls.append(('get', container_id))
+
+        for container in self.items:
+            if container.id == container_id:
+                return container
+
+        raise NotFound('No such container: %s' % container_id)
+
+
+class FakeService(object):
+    def __init__(self, service_id, name, labels=None, networks=None, virtual_ips=None, ports=None, client=None):
+        self.client = client
+        self.id = service_id
+        self.short_id = service_id[:10]
+        self.name = name
+        self.labels = labels or dict()
+        self.attrs = {
+            'Version': {'Index': 1},
+            'Spec': {
+                'Labels': self.labels,
+                'TaskTemplate': {
+                    'ContainerSpec': {'Image': 'alpine'},
+                    'Networks': list({'Target': network_id} for network_id in networks or list())
+                },
+                'EndpointSpec': {'Ports': ports or list()}
+            },
+            'Endpoint': {'VirtualIPs': virtual_ips or list()}
+        }
+
+    def tasks(self, filters=None):
+        self.client.calls.append(('service.tasks', self.id))
+
+        return list(t for t in self.client.api.tasks(filters=filters) if t['ServiceID'] == self.id)
+
+
+class FakeServices(object):
+    def __init__(self, client):
+        self.client = client
+        self.items = list()
+
+    def list(self, **kwargs):
+        self.client.calls.append(('services.list', kwargs))
+
+        for key in (kwargs.get('filters') or dict()):
+            if key not in ('id', 'label', 'name', 'mode'):
+                raise Exception('Invalid filter: %s' % key)
+
+        return list(s for s in self.items if matches_filters(s, kwargs.get('filters')))
+
+    def get(self, service_id):
+        self.client.calls.append(('services.get', service_id))
+
+        for service in self.items:
+            if service.id == service_id:
+                return service
+
+        raise NotFound('No such service: %s' % service_id)
+
+
+def fake_task(task_id, service_id, slot, desired_state='running', networks=None, labels=None, env=None):
+    return {
+        'ID': task_id, 'ServiceID': service_id, 'Slot': slot, 'NodeID': 'node-1',
+        'Status': {'State': desired_state, 'ContainerStatus': {'ContainerID': 'ctr-%s' % task_id}},
+        'Spec': {'ContainerSpec': {'Image': 'alpine', 'Labels': labels or dict(), 'Env': env or list()}},
+        'DesiredState': desired_state,
+        'NetworksAttachments': list(
+            {'Network': {'ID': network_id, 'Spec': {'Name': network_name, 'Ingress': is_ingress}},
+             'Addresses': [address]}
+            for network_id, network_name, is_ingress, address in networks or list())
+    }
+
+
+class FakeNode(object):
+    def __init__(self, node_id, hostname, role='worker'):
+        self.id = node_id
+        self.short_id = node_id[:10]
+        self.version = 1
+        self.attrs = {
+            'Spec': {'Role': role, 'Availability': 'active'},
+            'Status': {'State': 'ready', 'Addr': '10.0.0.1'},
+            'Description': {'Hostname': hostname}
+        }
+
+
+class FakeNodes(object):
+    def __init__(self, client):
+        self.client = client
+        self.items = list()
+
+    def list(self, **kwargs):
+        self.client.calls.append(('nodes.list', kwargs))
+
+        return list(self.items)
+
+    def get(self, node_id):
+        self.client.calls.append(('nodes.get', node_id))
+
+        for node in self.items:
+            if node.id == node_id:
+                return node
+
+        raise NotFound('No such node: %s' % node_id)
+
+
+class FakeLowLevelApi(object):
+    def __init__(self, client):
+        self.client = client
+
+    def containers(self, **kwargs):
+        self.client.calls.append(('api.containers', kwargs))
+
+        return list({'Id': c.id} for c in self.client.containers.list(**kwargs))
+
+    def tasks(self, filters=None):
+        self.client.calls.append(('api.tasks', filters))
+
+        desired_state = (filters or dict()).get('desired-state')
+        service_ids = (filters or dict()).get('service')
+
+        return list(t for t in self.client.task_items
+                    if (not desired_state or t['DesiredState'] == desired_state) and
+                    (not service_ids or t['ServiceID'] in service_ids))
+
+    def inspect_task(self, task_id):
+        self.client.calls.append(('api.inspect_task', task_id))
+
+        for task in self.client.task_items:
+            if task['ID'] == task_id:
+                return task
+
+        raise NotFound('No such task: %s' % task_id)
+
+    def close(self):
+        pass
+
+
+class FakeSwarm(object):
+    def __init__(self, client):
+        self.client = client
+        self.swarm_attrs = dict()
+
+    @property
+    def attrs(self):
+        self.client.calls.append(('swarm.attrs', None))
+
+        return self.swarm_attrs
+
+
+class FakeClient(object):
+    def __init__(self):
+        self.calls = list()
+        self.containers = FakeContainers(self)
+        self.api = FakeLowLevelApi(self)
+        self.services = FakeServices(self)
+        self.nodes = FakeNodes(self)
+        self.task_items = list()
+        self.swarm = FakeSwarm(self)
+        self.event_stream = list()
+
+    def events(self, **kwargs):
+        self.calls.append(('events', kwargs))
+
+        return iter(self.event_stream)
@@ -0,0 +1,565 @@
+import gc
+import unittest
+import weakref
+
+import api
+from fake_helper import FakeClient, FakeContainer, FakeNode, FakeService, fake_task
+
+
+def container_event(action, container_id):
+    return {'Type': 'container', 'Action': action, 'status': action,
+            'id': container_id, 'Actor': {'ID': container_id, 'Attributes': dict()}}
+
+
+class DockerApiTest(unittest.TestCase):
+    def setUp(self):
+        self.client = FakeClient()
+
+        self.original_from_env = api.docker.from_env
+        api.docker.from_env = lambda **kwargs: self.client
+
+    def tearDown(self):
+        api.docker.from_env = self.original_from_env
+
+    def add_container(self, container_id, name, status='running', **kwargs):
+        container = FakeContainer(container_id, name, status, **kwargs)
+        self.client.containers.items.insert(0, container)
+        return container
+
+    def consume_events(self, docker_api, *events):
+        self.client.event_stream = list(events)
+
+        return list(docker_api.events(decode=True))
+
+    def test_containers_without_cache(self):
+        self.add_container('c001', 'first')
+        self.add_container('c002', 'second', status='exited')
+
+        docker_api = api.DockerApi(None)
+
+        self.assertEqual(list(c.name for c in docker_api.containers()), ['first'])
+        self.assertEqual(list(c.name for c in docker_api.containers(all=True)), ['second', 'first'])
+        self.assertEqual(len(self.client.calls), 2)
+
+    def test_concurrent_container_listing(self):
+        for index in range(10):
+            self.add_container('c%03d' % index, 'container-%d' % index, status='running' if index % 2 else 'exited')
+
+        docker_api = api.DockerApi(None, concurrency=3)
+
+        try:
+            self.assertEqual(list(c.name for c in docker_api.containers()),
+                             ['container-9', 'container-7', 'container-5', 'container-3', 'container-1'])
+            self.assertEqual(len(docker_api.containers(all=True)), 10)
+
+            self.assertEqual(len(list(call for call in self.client.calls if call[0] == 'get')), 15)
+
+        finally:
+            docker_api.close()
+
+    def test_single_fetch_state(self):
+        self.add_container('c001', 'first')
+        self.add_container('c002', 'second', status='exited')
+        self.add_container('c003', 'third')
+
+        docker_api = api.DockerApi(None, single_fetch=True)
+
+        state = docker_api.state
+
+        self.assertEqual(list(c.name for c in state.containers), ['third', 'first'])
+        self.assertEqual(list(c.name for c in state.all_containers), ['third', 'second', 'first'])
+        self.assertIs(state.containers.first, state.all_containers.first)
+
+        self.assertEqual(list(call for call in self.client.calls if call[0] == 'list'), [('list', {'all': True})])
+
+    def test_container_cache(self):
+        self.add_container('c001', 'first')
+        self.add_container('c002', 'second')
+        self.add_container('c003', 'stopped', status='exited')
+
+        docker_api = api.DockerApi(None, container_cache=True)
+
+        self.assertEqual(list(c.name for c in docker_api.containers()), ['second', 'first'])
+        self.assertEqual(list(c.name for c in docker_api.containers(all=True)), ['stopped', 'second', 'first'])
+        self.assertEqual(list(c.name for c in docker_api.state.containers), ['second', 'first'])
+        self.assertEqual(self.client.calls, [('list', {'all': True}), ('swarm.attrs', None)])
+
+    def test_container_cache_updates_from_events(self):
+        self.add_container('c001', 'first')
+        second = self.add_container('c002', 'second')
+
+        docker_api = api.DockerApi(None, container_cache=True)
+
+        self.assertEqual(len(docker_api.containers()), 2)
+
+        del self.client.calls[:]
+
+        self.add_container('c003', 'third')
+        second.status = 'exited'
+
+        self.consume_events(docker_api,
+                            container_event('start', 'c003'),
+                            container_event('die', 'c002'),
+                            container_event('exec_start: sh', 'c001'))
+
+        self.assertEqual(list(c.name for c in docker_api.containers()), ['third', 'first'])
+        self.assertEqual(list(c.name for c in docker_api.containers(all=True)), ['third', 'second', 'first'])
+        self.assertEqual(self.client.calls, [('events', {'decode': True}), ('get', 'c003'), ('get', 'c002')])
+
+        self.client.containers.items.remove(second)
+
+        self.consume_events(docker_api, container_event('destroy', 'c002'))
+
+        self.assertEqual(list(c.name for c in docker_api.containers(all=True)), ['third', 'first'])
+
+    def test_container_cache_updates_from_network_events(self):
+        first = self.add_container('c001', 'first')
+
+        docker_api = api.DockerApi(None, container_cache=True)
+
+        self.assertEqual(len(docker_api.containers().first.networks), 0)
+
+        first.attrs['NetworkSettings']['Networks']['proxy'] = {'NetworkID': 'n001', 'IPAddress': '10.0.0.2'}
+
+        self.consume_events(docker_api, {'Type': 'network', 'Action': 'connect',
+                                         'Actor': {'ID': 'n001', 'Attributes': {'container': 'c001',
+                                                                                'name': 'proxy'}}})
+
+        self.assertEqual(list(n.name for n in docker_api.containers().first.networks), ['proxy'])
+
+        del first.attrs['NetworkSettings']['Networks']['proxy']
+
+        self.consume_events(docker_api, {'Type': 'network', 'Action': 'disconnect',
+                                         'Actor': {'ID': 'n001', 'Attributes': {'container': 'c001',
+                                                                                'name': 'proxy'}}})
+
+        self.assertEqual(len(docker_api.containers().first.networks), 0)
+
+        # other network events do not refer to containers
+        del self.client.calls[:]
+
+        self.consume_events(docker_api, {'Type': 'network', 'Action': 'create',
+                                         'Actor': {'ID': 'n002', 'Attributes': {'name': 'other'}}})
+
+        self.assertEqual(self.client.calls, [('events', {'decode': True})])
+
+    def test_container_cache_reloads_after_failed_listing(self):
+        self.add_container('c001', 'first')
+
+        docker_api = api.DockerApi(None, container_cache=True)
+
+        original_list = self.client.containers.list
+
+        def failing_list(**kwargs):
+            raise IOError('Connection lost')
+
+        self.client.containers.list = failing_list
+
+        self.assertRaises(IOError, docker_api.containers)
+        self.assertFalse(docker_api.container_cache.is_loaded)
+
+        self.client.containers.list = original_list
+
+        self.assertEqual(list(c.name for c in docker_api.containers()), ['first'])
+
+    def test_container_cache_drops_missing_containers(self):
+        first = self.add_container('c001', 'first')
+
+        docker_api = api.DockerApi(None, container_cache=True)
+
+        self.assertEqual(len(docker_api.containers()), 1)
+
+        self.client.containers.items.remove(first)
+
+        self.consume_events(docker_api, container_event('die', 'c001'))
+
+        self.assertEqual(len(docker_api.containers(all=True)), 0)
+
+    def add_service(self, service_id, name, *tasks, **kwargs):
+        service = FakeService(service_id, name, client=self.client, **kwargs)
+        self.client.services.items.append(service)
+        self.client.task_items.extend(tasks)
+        return service
+
+    def test_services_with_bulk_task_query(self):
+        self.client.swarm.swarm_attrs = {'ID': 'swarm'}
+
+        self.add_service('s001', 'first',
+                         fake_task('t001', 's001', 1), fake_task('t002', 's001', 2),
+                         fake_task('t003', 's001', 1, desired_state='shutdown'))
+        self.add_service('s002', 'second', fake_task('t004', 's002', 1))
+        self.add_service('s003', 'third')
+
+        docker_api = api.DockerApi(None)
+
+        self.assertTrue(docker_api.is_swarm_mode)
+
+        del self.client.calls[:]
+
+        services = docker_api.services()
+
+        self.assertEqual(list(s.name for s in services), ['first', 'second', 'third'])
+        self.assertEqual(list(t.id for t in services.matching('first').first.tasks), ['t001', 't002'])
+        self.assertEqual(list(t.name for t in services.matching('second').first.tasks), ['second.1.t004'])
+        self.assertEqual(len(services.matching('third').first.tasks), 0)
+
+        self.assertEqual(self.client.calls, [('services.list', {}), ('api.tasks', {'desired-state': 'running'})])
+
+        del self.client.calls[:]
+
+        services = docker_api.services(desired_task_state='')
+
+        self.assertEqual(list(t.id for t in services.matching('first').first.tasks), ['t001', 't002', 't003'])
+        self.assertEqual(self.client.calls, [('services.list', {}), ('api.tasks', None)])
+
+    def test_swarm_mode_is_cached(self):
+        docker_api = api.DockerApi(None)
+
+        self.assertFalse(docker_api.is_swarm_mode)
+        self.assertEqual(len(docker_api.services()), 0)
+        self.assertEqual(len(docker_api.nodes()), 0)
+        self.assertFalse(docker_api.is_swarm_mode)
+
+        self.assertEqual(self.client.calls, [('swarm.attrs', None)])
+
+        self.client.swarm.swarm_attrs = {'ID': 'swarm'}
+
+        self.consume_events(docker_api, container_event('start', 'c001'))
+
+        self.assertFalse(docker_api.is_swarm_mode)
+
+        self.consume_events(docker_api, {'Type': 'node', 'Action': 'create', 'Actor': {'ID': 'n001'}})
+
+        self.assertTrue(docker_api.is_swarm_mode)
+
+        self.client.swarm.swarm_attrs = dict()
+
+        self.assertTrue(docker_api.is_swarm_mode)
+
+        docker_api.refresh()
+
+        self.assertFalse(docker_api.is_swarm_mode)
+
+    def test_single_fetch_services(self):
+        self.client.swarm.swarm_attrs = {'ID': 'swarm'}
+
+        self.add_service('s001', 'first',
+                         fake_task('t001', 's001', 1), fake_task('t002', 's001', 2),
+                         fake_task('t003', 's001', 1, desired_state='shutdown'))
+        self.add_service('s002', 'second', fake_task('t004', 's002', 1, desired_state='shutdown'))
+
+        docker_api = api.DockerApi(None, single_fetch=True)
+
+        state = docker_api.state
+
+        self.assertEqual(list(t.id for t in state.services.matching('first').first.tasks), ['t001', 't002'])
+        self.assertEqual(list(t.id for t in state.all_services.matching('first').first.tasks), ['t001', 't002', 't003'])
+        self.assertEqual(len(state.services.matching('second').first.tasks), 0)
+        self.assertEqual(len(state.all_services.matching('second').first.tasks), 1)
+
+        self.assertIs(state.services.first.tasks.first, state.all_services.first.tasks.first)
+
+        self.assertEqual(list(call for call in self.client.calls if call[0] in ('api.tasks', 'services.list')),
+                         [('services.list', {}), ('api.tasks', None)])
+
+    def test_node_cache(self):
+        self.client.swarm.swarm_attrs = {'ID': 'swarm'}
+        self.client.nodes.items.extend([FakeNode('n001', 'manager', role='manager'), FakeNode('n002', 'worker')])
+
+        docker_api = api.DockerApi(None, node_cache_ttl=60)
+
+        self.assertEqual(list(n.name for n in docker_api.nodes()), ['manager', 'worker'])
+        self.assertEqual(list(n.name for n in docker_api.state.nodes), ['manager', 'worker'])
+
+        self.client.nodes.items.append(FakeNode('n003', 'another'))
+        self.client.nodes.items[1].attrs['Spec']['Availability'] = 'drain'
+
+        self.consume_events(docker_api,
+                            {'Type': 'node', 'Action': 'create', 'Actor': {'ID': 'n003'}},
+                            {'Type': 'node', 'Action': 'update', 'Actor': {'ID': 'n002'}},
+                            {'Type': 'node', 'Action': 'remove', 'Actor': {'ID': 'n001'}})
+
+        nodes = docker_api.nodes()
+
+        self.assertEqual(list(n.name for n in nodes), ['worker', 'another'])
+        self.assertEqual(nodes.matching('worker').first.availability, 'drain')
+
+        self.assertEqual(list(call for call in self.client.calls if call[0].startswith('nodes.')),
+                         [('nodes.list', {}), ('nodes.get', 'n003'), ('nodes.get', 'n002')])
+
+    def test_node_cache_reloads_after_failed_listing(self):
+        self.client.swarm.swarm_attrs = {'ID': 'swarm'}
+        self.client.nodes.items.append(FakeNode('n001', 'manager', role='manager'))
+
+        docker_api = api.DockerApi(None, node_cache_ttl=60)
+
+        original_list = self.client.nodes.list
+
+        def failing_list(**kwargs):
+            raise IOError('Connection lost')
+
+        self.client.nodes.list = failing_list
+
+        self.assertRaises(IOError, docker_api.nodes)
+        self.assertFalse(docker_api.node_cache.is_loaded)
+        self.assertTrue(docker_api.node_cache.is_expired)
+
+        self.client.nodes.list = original_list
+
+        self.assertEqual(list(n.name for n in docker_api.nodes()), ['manager'])
+
+    def test_node_cache_expires(self):
+        self.client.swarm.swarm_attrs = {'ID': 'swarm'}
+        self.client.nodes.items.append(FakeNode('n001', 'manager', role='manager'))
+
+        docker_api = api.DockerApi(None, node_cache_ttl=60)
+
+        self.assertEqual(len(docker_api.nodes()), 1)
+
+        self.client.nodes.items.append(FakeNode('n002', 'worker'))
+
+        self.assertEqual(len(docker_api.nodes()), 1)
+
+        docker_api.node_cache.loaded_at -= 120
+
+        self.assertEqual(len(docker_api.nodes()), 2)
+
+    def test_server_side_event_filters(self):
+        docker_api = api.DockerApi(None)
+
+        self.assertEqual(docker_api.event_filters(['start', 'die', 'health_status']),
+                         {'type': ['container', 'node'],
+                          'event': ['create', 'die', 'health_status', 'remove', 'start', 'update']})
+
+        self.assertEqual(docker_api.event_filters(['start', 'health_status: healthy']),
+                         {'type': ['container', 'node'],
+                          'event': ['create', 'health_status', 'remove', 'start', 'update']})
+
+        # unknown actions could belong to any type of object
+        self.assertEqual(docker_api.event_filters(['start', 'pull']),
+                         {'event': ['create', 'pull', 'remove', 'start', 'update']})
+
+        list(docker_api.events(watched=['start'], decode=True))
+
+        self.assertEqual(self.client.calls[-1],
+                         ('events', {'decode': True,
+                                     'filters': {'type': ['container', 'node'],
+                                                 'event': ['create', 'remove', 'start', 'update']}}))
+
+    def test_server_side_event_filters_with_container_cache(self):
+        docker_api = api.DockerApi(None, container_cache=True)
+
+        filters = docker_api.event_filters(['start'])
+
+        self.assertEqual(filters['type'], ['container', 'network', 'node'])
+
+        for action in ('start', 'die', 'destroy', 'health_status', 'rename', 'update', 'connect', 'disconnect'):
+            self.assertIn(action, filters['event'])
+
+    def test_filtered_containers(self):
+        self.add_container('c001', 'first', labels={'virtual-host': 'first.example.com'})
+        self.add_container('c002', 'second')
+        self.add_container('c003', 'third', labels={'virtual-host': 'third.example.com'})
+
+        docker_api = api.DockerApi(None, filters={'label': ['virtual-host']})
+
+        self.assertEqual(list(c.name for c in docker_api.containers()), ['third', 'first'])
+        self.assertEqual(list(c.name for c in docker_api.containers(filtered=False)), ['third', 'second', 'first'])
+        self.assertEqual(self.client.calls[0], ('list', {'filters': {'label': ['virtual-host']}}))
+
+    def test_filtered_container_cache(self):
+        self.add_container('c001', 'first', labels={'virtual-host': 'first.example.com'})
+
+        docker_api = api.DockerApi(None, container_cache=True, filters={'label': ['virtual-host']})
+
+        self.assertEqual(list(c.name for c in docker_api.containers()), ['first'])
+
+        self.add_container('c002', 'second')
+        self.add_container('c003', 'third', labels={'virtual-host': 'third.example.com'})
+
+        self.consume_events(docker_api, container_event('start', 'c002'), container_event('start', 'c003'))
+
+        self.assertEqual(list(c.name for c in docker_api.containers()), ['third', 'first'])
+        self.assertEqual(list(c.name for c in docker_api.containers(filtered=False)), ['third', 'second', 'first'])
+
+    def test_filtered_services(self):
+        self.client.swarm.swarm_attrs = {'ID': 'swarm'}
+
+        self.add_service('s001', 'first', fake_task('t001', 's001', 1), labels={'virtual-host': 'first.example.com'})
+        self.add_service('s002', 'second', fake_task('t002', 's002', 1))
+
+        docker_api = api.DockerApi(None, filters={'label': ['virtual-host']})
+
+        self.assertTrue(docker_api.is_swarm_mode)
+
+        del self.client.calls[:]
+
+        services = docker_api.services()
+
+        self.assertEqual(list(s.name for s in services), ['first'])
+        self.assertEqual(list(t.id for t in services.first.tasks), ['t001'])
+        self.assertEqual(self.client.calls,
+                         [('services.list', {'filters': {'label': ['virtual-host']}}),
+                          ('api.tasks', {'desired-state': 'running', 'service': ['s001']})])
+
+        self.assertEqual(len(docker_api.services(filtered=False)), 2)
+
+    def test_services_skip_container_only_filters(self):
+        self.client.swarm.swarm_attrs = {'ID': 'swarm'}
+
+        self.add_service('s001', 'first', fake_task('t001', 's001', 1), labels={'virtual-host': 'first.example.com'})
+        self.add_service('s002', 'second', fake_task('t002', 's002', 1))
+
+        docker_api = api.DockerApi(None, filters={'label': ['virtual-host'], 'status': ['running']})
+
+        self.assertTrue(docker_api.is_swarm_mode)
+
+        del self.client.calls[:]
+
+        self.assertEqual(list(s.name for s in docker_api.services()), ['first'])
+        self.assertEqual(self.client.calls[0], ('services.list', {'filters': {'label': ['virtual-host']}}))
+
+        del self.client.calls[:]
+
+        services, all_services = docker_api._services_with_all_tasks()
+
+        self.assertEqual(list(s.name for s in all_services), ['first'])
+        self.assertEqual(self.client.calls[0], ('services.list', {'filters': {'label': ['virtual-host']}}))
+
+    def test_event_filters_with_labels(self):
+        docker_api = api.DockerApi(None, filters={'label': ['virtual-host']})
+
+        filters = docker_api.event_filters(['start'])
+
+        self.assertNotIn('label', filters)
+        self.assertIn('node', filters['type'])
+
+        docker_api = api.DockerApi(None, filters={'label': ['virtual-host']}, node_cache_ttl=60)
+
+        self.assertNotIn('label', docker_api.event_filters(['start']))
+
+    def test_lazy_raw_containers(self):
+        self.add_container('c001', 'first', labels={'pygen.target': 'app'})
+
+        docker_api = api.DockerApi(None, lazy_raw=True)
+
+        container = docker_api.containers().first
+
+        self.assertEqual(container.labels['pygen.target'], 'app')
+        self.assertEqual(container.env.key, 'value')
+        self.assertEqual(len(container.networks), 0)
+        self.assertIsInstance(container.raw, api.Lazy)
+        self.assertNotIn(('get', 'c001'), self.client.calls)
+
+        self.assertEqual(container.raw.name, 'first')
+        self.assertEqual(self.client.calls[-1], ('get', 'c001'))
+
+        # the listings of the actions keep the containers they have already
+        del self.client.calls[:]
+
+        container = docker_api.containers(filtered=False).first
+
+        self.assertIs(container.raw, self.client.containers.items[0])
+        self.assertNotIn(('get', 'c001'), self.client.calls)
+
+    def test_lazy_raw_services(self):
+        self.client.swarm.swarm_attrs = {'ID': 'swarm'}
+
+        self.add_service('s001', 'first', fake_task('t001', 's001', 1))
+
+        docker_api = api.DockerApi(None, lazy_raw=True)
+
+        service = docker_api.services().first
+
+        self.assertIsInstance(service.raw, api.Lazy)
+        self.assertIsInstance(service.tasks.first.raw, api.Lazy)
+        self.assertEqual(service.tasks.first.labels['com.docker.swarm.service.name'], 'first')
+        self.assertEqual(len(service.networks), 0)
+        self.assertNotIn(('services.get', 's001'), self.client.calls)
+
+        self.assertEqual(service.raw.name, 'first')
+        self.assertEqual(self.client.calls[-1], ('services.get', 's001'))
+
+        del self.client.calls[:]
+
+        service = docker_api.services(filtered=False).first
+
+        self.assertIs(service.raw, self.client.services.items[0])
+        self.assertNotIn(('services.get', 's001'), self.client.calls)
+
+    def test_unchanged_containers_are_reused(self):
+        first = self.add_container('c001', 'first')
+        second = self.add_container('c002', 'second')
+
+        docker_api = api.DockerApi(None)
+
+        containers = docker_api.containers()
+
+        second.attrs['State']['StartedAt'] = '2018-01-01T12:00:00Z'
+
+        updated = docker_api.containers()
+
+        self.assertIs(updated.matching('first').first, containers.matching('first').first)
+        self.assertIsNot(updated.matching('second').first, containers.matching('second').first)
+        self.assertIs(updated.matching('first').first.raw, first)
+
+        first.attrs['NetworkSettings']['Networks']['backend'] = {'NetworkID': 'n001', 'IPAddress': '10.0.0.2'}
+
+        self.assertIsNot(docker_api.containers().matching('first').first, updated.matching('first').first)
+        self.assertIsNot(docker_api.containers(all=True).first, updated.first)
+
+    def test_unfiltered_containers_are_not_shared(self):
+        self.add_container('c001', 'first')
+
+        docker_api = api.DockerApi(None)
+
+        containers = docker_api.containers()
+        unfiltered = docker_api.containers(filtered=False)
+
+        self.assertIsNot(unfiltered.first, containers.first)
+        self.assertIsNot(docker_api.containers(filtered=False).first, unfiltered.first)
+        self.assertIs(docker_api.containers().first, containers.first)
+
+    def test_reused_containers_release_previous_details(self):
+        first = self.add_container('c001', 'first')
+
+        docker_api = api.DockerApi(None)
+
+        containers = docker_api.containers()
+
+        # the next inspection returns new details of the unchanged container
+        replacement = FakeContainer('c001', 'first')
+        self.client.containers.items[:] = [replacement]
+
+        previous = weakref.ref(first)
+        del first
+
+        updated = docker_api.containers()
+
+        self.assertIs(updated.first, containers.first)
+        self.assertIs(updated.first.raw, replacement)
+
+        gc.collect()
+
+        self.assertIsNone(previous())
+        self.assertEqual(updated.first.env.key, 'value')
+
+    def test_unchanged_containers_are_reused_with_concurrency(self):
+        self.add_container('c001', 'first')
+        second = self.add_container('c002', 'second')
+
+        docker_api = api.DockerApi(None, concurrency=2)
+
+        try:
+            containers = docker_api.containers()
+
+            second.attrs['State']['Health'] = {'Status': 'healthy'}
+
+            updated = docker_api.containers()
+
+            self.assertIs(updated.matching('first').first, containers.matching('first').first)
+            self.assertIsNot(updated.matching('second').first, containers.matching('second').first)
+            self.assertEqual(updated.matching('second').first.health, 'healthy')
+
+        finally:
+            docker_api.close()
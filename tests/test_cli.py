@@ -68,6 +68,15 @@ class CliTest(unittest.TestCase):
 
         self.assertEqual(args.signal, [['target-container', 'HUP'], ['second-container', 'INT']])
 
+    def test_filter_argument(self):
+        args = cli.parse_arguments(['--template', 'test.template',
+                                    '--filter', 'label=virtual-host',
+                                    '--filter', 'label=tier=proxy'])
+
+        self.assertEqual(args.filter, [('label', 'virtual-host'), ('label', 'tier=proxy')])
+
+        self.assertRaises(SystemExit, cli.parse_arguments, ['--template', 'test.template', '--filter', 'invalid'])
+
     def test_swarm_worker_arguments(self):
         self.assertRaises(SystemExit, swarm_worker.parse_arguments)
         self.assertRaises(SystemExit, swarm_worker.parse_arguments, ['--debug'])
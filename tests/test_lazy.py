@@ -1,6 +1,8 @@
+import time
 import unittest
+import threading
 
-from utils import Lazy, EnhancedList, EnhancedDict
+from utils import Lazy, LazyDict, EnhancedList, EnhancedDict, StringInterner
 
 
 class LazyTest(unittest.TestCase):
@@ -40,3 +42,177 @@ class LazyTest(unittest.TestCase):
 
         self.assertEqual(lazy.key, 'lazy')
 
+    def test_lazy_dict(self):
+        calls = list()
+
+        def factory():
+            calls.append(1)
+            return EnhancedDict(key='value')
+
+        lazy = LazyDict(eager='yes').lazy('nested', factory)
+
+        self.assertIn('nested', lazy)
+        self.assertEqual(len(lazy), 2)
+        self.assertTrue(lazy)
+        self.assertEqual(sorted(lazy.keys()), ['eager', 'nested'])
+        self.assertEqual(len(calls), 0)
+
+        self.assertEqual(lazy.nested.key, 'value')
+        self.assertEqual(lazy['nested'].key, 'value')
+        self.assertEqual(lazy.get('nested').key, 'value')
+        self.assertEqual(len(calls), 1)
+
+        self.assertEqual(lazy.get('missing', 'default'), 'default')
+        self.assertIsNone(lazy.missing)
+        self.assertRaises(KeyError, lambda: lazy['missing'])
+
+    def test_lazy_dict_overrides(self):
+        lazy = LazyDict().lazy('first', lambda: 1).lazy('second', lambda: 2)
+
+        lazy.update(first='one')
+        lazy['second'] = 'two'
+
+        self.assertEqual(dict(lazy.items()), {'first': 'one', 'second': 'two'})
+
+        lazy = LazyDict().lazy('first', lambda: 1).lazy('second', lambda: 2)
+
+        del lazy['first']
+
+        # Python 2 copies dict subclasses by their storage in dict(lazy)
+        self.assertEqual(dict(lazy.items()), {'second': 2})
+        self.assertEqual(lazy.copy(), {'second': 2})
+
+        lazy = LazyDict().lazy('first', lambda: 1).lazy('second', lambda: 2)
+
+        self.assertEqual(lazy.setdefault('first', 'one'), 1)
+        self.assertEqual(lazy.setdefault('third', 3), 3)
+        self.assertEqual(lazy, {'first': 1, 'second': 2, 'third': 3})
+        self.assertNotEqual(lazy, {'first': 1})
+
+        popped = dict(lazy.popitem() for _ in range(3))
+
+        self.assertEqual(popped, {'first': 1, 'second': 2, 'third': 3})
+        self.assertEqual(len(lazy), 0)
+
+        lazy = LazyDict(id='x').lazy('first', lambda: 1)
+
+        self.assertEqual(hash(lazy), hash('x'))
+
+        if hasattr(dict, 'iteritems'):
+            self.assertTrue(lazy.has_key('first'))
+            self.assertEqual(dict(lazy.iteritems()), {'id': 'x', 'first': 1})
+            self.assertEqual(sorted(lazy.iterkeys()), ['first', 'id'])
+            self.assertEqual(sorted(lazy.viewvalues()), [1, 'x'])
+
+    def test_lazy_dict_from_threads(self):
+        calls = list()
+
+        def slow_factory():
+            calls.append(1)
+            time.sleep(0.01)
+            return 'value'
+
+        lazy = LazyDict().lazy('key', slow_factory)
+        results = list()
+
+        def read():
+            results.append((lazy.get('key'), 'key' in lazy, len(lazy)))
+
+        threads = list(threading.Thread(target=read) for _ in range(5))
+
+        for thread in threads:
+            thread.start()
+
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(results, [('value', True, 1)] * 5)
+        self.assertEqual(len(calls), 1)
+
+    def test_compact_dict(self):
+        item = EnhancedDict(Key='value').default('')
+
+        self.assertRaises(AttributeError, object.__getattribute__, item, '__dict__')
+        self.assertEqual(item.key, 'value')
+        self.assertEqual(item.missing, '')
+        self.assertEqual(item.default_value, '')
+
+        item.other = 'set'
+
+        self.assertEqual(item['other'], 'set')
+        self.assertEqual(item, {'Key': 'value', 'other': 'set'})
+
+        item.default_value = 'unset'
+
+        self.assertEqual(item.missing, 'unset')
+        self.assertNotIn('default_value', item)
+
+        self.assertRaises(AttributeError, setattr, item, 'keys', None)
+        self.assertNotIn('keys', item)
+
+        lazy = LazyDict().lazy('key', lambda: 'value')
+
+        self.assertRaises(AttributeError, object.__getattribute__, lazy, '__dict__')
+        self.assertEqual(lazy.key, 'value')
+        self.assertIsNone(lazy.missing)
+
+    def test_string_interner(self):
+        interner = StringInterner(max_size=2)
+
+        first = ''.join(['com.docker.', 'compose'])
+        second = ''.join(['com.docker.', 'compose'])
+
+        self.assertIsNot(first, second)
+        self.assertIs(interner.intern(first), first)
+        self.assertIs(interner.intern(second), first)
+        self.assertEqual(interner.intern(42), 42)
+        self.assertIsNone(interner.intern(None))
+
+        interner.intern('other')
+
+        self.assertEqual(len(interner), 2)
+
+        interner.intern('third')
+
+        self.assertEqual(len(interner), 1)
+        self.assertIs(interner.intern(second), second)
+
+    def test_case_insensitive_keys(self):
+        item = EnhancedDict({'Context-Path': '/app', 'context-path': '/other', 'Port': 80}).default('')
+
+        self.assertEqual(getattr(item, 'CONTEXT-PATH'), '/app')
+        self.assertEqual(item.port, 80)
+        self.assertEqual(item.missing, '')
+
+        item['Missing'] = 'added'
+
+        self.assertEqual(item.missing, 'added')
+
+        del item['Port']
+
+        self.assertEqual(item.port, '')
+
+        item.update(PORT=8080)
+
+        self.assertEqual(item.port, 8080)
+
+        item.pop('PORT')
+        item.setdefault('pOrT', 9090)
+
+        self.assertEqual(item.port, 9090)
+
+        item.clear()
+
+        self.assertEqual(item.port, '')
+
+        lazy = LazyDict().lazy('Key', lambda: 'value')
+
+        self.assertEqual(lazy.key, 'value')
+
+        lazy.lazy('Other', lambda: 'other')
+
+        self.assertEqual(lazy.other, 'other')
+
+        del lazy['Other']
+
+        self.assertIsNone(lazy.other)
@@ -152,6 +152,134 @@ class MatchingTest(unittest.TestCase):
         self.assertEqual(len(source.with_status('running')), 2)
         self.assertEqual(len(source.with_status('stopped')), 1)
 
+    def test_running_containers(self):
+        source = ContainerList([
+            ED(id='1', status='running'),
+            ED(id='2', status='exited'),
+            ED(id='3', status='paused'),
+            ED(id='4', status='created')
+        ])
+
+        self.assertEqual(list(c.id for c in source.running), ['1', '3'])
+        self.assertIsInstance(source.running, ContainerList)
+
+    def test_matching_order(self):
+        source = ContainerList([
+            ED(id='c1', name='web', labels={'com.docker.compose.service': 'app'}),
+            ED(id='app-id', name='x', labels={}),
+            ED(id='c3', name='app', labels={}),
+            ED(id='c4', name='y', labels={'com.docker.swarm.service.name': 'stack_app',
+                                          'com.docker.stack.namespace': 'stack'}),
+            ED(id='c5', name='z', labels={'pygen.target': 'app'}),
+            ED(id='c6', name='other', labels={'com.docker.compose.service': 'other'})
+        ])
+
+        self.assertEqual(list(c.id for c in source.matching('app')), ['c3', 'c5', 'app-id', 'c1', 'c4'])
+        self.assertEqual(list(c.id for c in source.matching('c')), ['c1', 'c3', 'c4', 'c5', 'c6'])
+        self.assertEqual(list(c.id for c in source.not_matching('app')), ['c6'])
+        self.assertEqual(len(source.matching(['app'])), 0)
+        self.assertEqual(len(source.matching(None)), 0)
+
+    def test_matching_follows_list_changes(self):
+        source = ContainerList([
+            ED(id='c1', name='first', labels={}),
+            ED(id='c2', name='second', labels={})
+        ])
+
+        self.assertEqual(len(source.matching('third')), 0)
+
+        source.append(ED(id='c3', name='third', labels={}))
+
+        self.assertEqual(list(c.id for c in source.matching('third')), ['c3'])
+
+        source.insert(0, ED(id='c0', name='third', labels={}))
+
+        self.assertEqual(list(c.id for c in source.matching('third')), ['c0', 'c3'])
+
+        source.remove(source.first)
+        source[0] = ED(id='c4', name='fourth', labels={})
+
+        self.assertEqual(list(c.id for c in source.matching('third')), ['c3'])
+        self.assertEqual(list(c.id for c in source.matching('fourth')), ['c4'])
+
+        source.reverse()
+
+        self.assertEqual(list(c.id for c in source.matching('c')), ['c3', 'c2', 'c4'])
+
+        del source[0]
+        source += [ED(id='c5', name='fourth', labels={})]
+
+        self.assertEqual(list(c.id for c in source.matching('fourth')), ['c4', 'c5'])
+
+    def test_where(self):
+        source = ContainerList([
+            ED(id='c1', status='running', health='healthy',
+               labels={'virtual-host': 'a.example.com'}, env={'PORT': '80'},
+               networks=NetworkList([ED(id='n1', name='frontend')])),
+            ED(id='c2', status='exited', health='unknown',
+               labels={'virtual-host': ''}, env={},
+               networks=NetworkList()),
+            ED(id='c3', status='running', health='unhealthy',
+               labels={'virtual-host': 'b.example.com'}, env={'PORT': '8080'},
+               networks=NetworkList([ED(id='n1', name='frontend'), ED(id='n2', name='backend')])),
+            ED(id='c4', status='running', health='healthy',
+               labels={'virtual-host': 'a.example.com'}, env={'PORT': '80'},
+               networks=NetworkList([ED(id='n2', name='backend')]))
+        ])
+
+        self.assertEqual(list(c.id for c in source.where(label='virtual-host')), ['c1', 'c3', 'c4'])
+        self.assertEqual(list(c.id for c in source.where(label='virtual-host=a.example.com')), ['c1', 'c4'])
+        self.assertEqual(list(c.id for c in source.where(label='virtual-host=')), ['c2'])
+        self.assertEqual(list(c.id for c in source.where(env='PORT=8080')), ['c3'])
+        self.assertEqual(list(c.id for c in source.where(network='frontend')), ['c1', 'c3'])
+        self.assertEqual(list(c.id for c in source.where(network='n2')), ['c3', 'c4'])
+        self.assertEqual(list(c.id for c in source.where(health='Healthy')), ['c1', 'c4'])
+        self.assertEqual(list(c.id for c in source.where(status='exited')), ['c2'])
+        self.assertEqual(list(c.id for c in source.where(label='virtual-host', network='backend', health='healthy')),
+                         ['c4'])
+        self.assertEqual(len(source.where(label='missing')), 0)
+        self.assertEqual(len(source.where()), 4)
+        self.assertIsInstance(source.where(status='running'), ContainerList)
+
+        source.append(ED(id='c5', status='running', labels={'virtual-host': 'c.example.com'}))
+
+        self.assertEqual(list(c.id for c in source.where(label='virtual-host')), ['c1', 'c3', 'c4', 'c5'])
+
+        tasks = TaskList([
+            ED(id='t1', status='running', labels={}), ED(id='t2', status='shutdown', labels={})
+        ])
+
+        self.assertEqual(list(t.id for t in tasks.where(status='running')), ['t1'])
+        self.assertIsInstance(tasks.where(status='running'), TaskList)
+
+    def test_group_by(self):
+        source = ContainerList([
+            ED(id='c1', labels=ED({'virtual-host': 'b.example.com', 'context-path': '/api'}).default('')),
+            ED(id='c2', labels=ED({'virtual-host': 'a.example.com'}).default('')),
+            ED(id='c3', labels=ED().default('')),
+            ED(id='c4', labels=ED({'virtual-host': 'b.example.com'}).default(''))
+        ])
+
+        groups = source.group_by('labels.virtual-host')
+
+        self.assertEqual(list(groups.keys()), ['', 'a.example.com', 'b.example.com'])
+        self.assertEqual(list(c.id for c in groups['b.example.com']), ['c1', 'c4'])
+        self.assertIsInstance(groups['b.example.com'], ContainerList)
+        self.assertIs(source.group_by('labels.virtual-host'), groups)
+
+        by_path = groups['b.example.com'].group_by('labels.context-path')
+
+        self.assertEqual(list((key, list(c.id for c in items)) for key, items in by_path.items()),
+                         [('', ['c4']), ('/api', ['c1'])])
+        self.assertIs(groups['b.example.com'].group_by('labels.context-path'), by_path)
+
+        self.assertEqual(list(source.group_by('labels.missing.nested').keys()), [None])
+
+        source.append(ED(id='c5', labels=ED({'virtual-host': 'c.example.com'})))
+
+        self.assertEqual(list(source.group_by('labels.virtual-host').keys()),
+                         ['', 'a.example.com', 'b.example.com', 'c.example.com'])
+
     def test_match_network_against_container_networks(self):
         source = NetworkList([
             ED(id='n01'), ED(id='n02'), ED(id='n03')
@@ -185,6 +313,32 @@ class MatchingTest(unittest.TestCase):
         self.assertEqual(source.not_matching('ingress').matching(target).first.id, 'n02')
         self.assertEqual(source.not_matching('ingress').matching(target).last.id, 'n03')
 
+        self.assertEqual(target.ids, frozenset(['n02', 'n03', 'n04', 'ii']))
+        self.assertIs(target.ids, target.ids)
+        self.assertEqual(len(source.matching(NetworkList([ED(id='n05')]))), 0)
+
+        target.append(ED(id='n05'))
+
+        self.assertIn('n05', target.ids)
+
+    def test_sharing_networks(self):
+        source = ContainerList([
+            ED(id='c1', networks=NetworkList([ED(id='n01', name='frontend')])),
+            ED(id='c2', networks=NetworkList([ED(id='n02', name='backend')])),
+            ED(id='c3', networks=NetworkList([ED(id='n01', name='frontend'), ED(id='n02', name='backend')])),
+            ED(id='c4', networks=NetworkList())
+        ])
+
+        reference = ED(id='x', networks=NetworkList([ED(id='n02', name='backend'), ED(id='n03', name='other')]))
+
+        self.assertEqual(list(c.id for c in source.sharing_networks(reference)), ['c2', 'c3'])
+        self.assertEqual(list(c.id for c in source.sharing_networks(source[0])), ['c1', 'c3'])
+        self.assertEqual(list(c.id for c in source.sharing_networks(ED(id='n01'))), ['c1', 'c3'])
+        self.assertEqual(list(c.id for c in source.sharing_networks(source[0].networks)), ['c1', 'c3'])
+        self.assertEqual(len(source.sharing_networks(source[3])), 0)
+        self.assertEqual(len(source.sharing_networks('frontend')), 0)
+        self.assertIsInstance(source.sharing_networks(reference), ContainerList)
+
     def test_keeps_list_types(self):
         items = ContainerList([
             ED(id='abc', labels={}), ED(id='def', labels={})
@@ -268,6 +422,60 @@ class MatchingTest(unittest.TestCase):
             self.assertIsNotNone(items.self)
             self.assertEqual(items.self.id, 's1')
 
+    def test_task_and_service_for_container(self):
+        items = ServiceList([
+            ED(id='s1', tasks=TaskList([
+                ED(id='t1', container_id='abcd1234', labels={}),
+                ED(id='t2', container_id=None, labels={})
+            ])),
+            ED(id='s2', tasks=TaskList([
+                ED(id='t3', container_id='defg5678', labels={})
+            ]))
+        ])
+
+        self.assertEqual(items.service_for_container('defg5678').id, 's2')
+        self.assertEqual(items.task_for_container('defg5678').id, 't3')
+        self.assertEqual(items.task_for_container('abcd1234').id, 't1')
+        self.assertIsNone(items.service_for_container('missing'))
+        self.assertIsNone(items.task_for_container(None))
+
+        with mock_container_id(None):
+            self.assertIsNone(items.self)
+
+        with mock_container_id('defg5678'):
+            self.assertEqual(items.self.id, 's2')
+
+    def test_current_container_id_is_cached(self):
+        import utils
+
+        calls = list()
+
+        def get_container_id():
+            calls.append(1)
+            return 'abcd%d' % len(calls)
+
+        original_function = utils.docker_helper.get_current_container_id
+        utils.docker_helper.get_current_container_id = get_container_id
+
+        try:
+            self.assertEqual(utils.refresh_current_container_id(), 'abcd1')
+
+            items = ContainerList([ED(id='abcd1', labels={}), ED(id='abcd2', labels={})])
+
+            self.assertEqual(items.self.id, 'abcd1')
+            self.assertEqual(items.self.id, 'abcd1')
+            self.assertEqual(utils.get_current_container_id(), 'abcd1')
+            self.assertEqual(len(calls), 1)
+
+            utils.refresh_current_container_id()
+
+            self.assertEqual(items.self.id, 'abcd2')
+            self.assertEqual(len(calls), 2)
+
+        finally:
+            utils.docker_helper.get_current_container_id = original_function
+            utils.refresh_current_container_id()
+
 
 def mock_container_id(container_id):
     import resources
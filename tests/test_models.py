@@ -0,0 +1,146 @@
+import unittest
+
+from fake_helper import FakeContainer, FakeService, fake_task
+from models import ContainerInfo, ServiceInfo, TaskInfo
+from resources import TaskList
+
+
+class ModelsTest(unittest.TestCase):
+    def test_container_info(self):
+        info = ContainerInfo(FakeContainer('c0001', 'sample', labels={'Some.Label': 'x'}, health='healthy',
+                                           env=['KEY=value', 'WITH_EQUALS=e=mc^2'],
+                                           networks={'backend': {'NetworkID': 'n001', 'IPAddress': '10.0.0.2'}},
+                                           ports={'80/tcp': {}, '53/udp': {}, '8080/tcp': {}}))
+
+        self.assertEqual(info.name, 'sample')
+        self.assertEqual(info['health'], 'healthy')
+
+        for key in ('raw', 'labels', 'env', 'networks', 'ports'):
+            self.assertIn(key, info)
+
+        self.assertEqual(info.labels['Some.Label'], 'x')
+        self.assertEqual(info.labels.get('some.label'), None)
+        self.assertEqual(getattr(info.labels, 'some.label'), 'x')
+        self.assertEqual(info.labels.missing, '')
+        self.assertEqual(info['env']['WITH_EQUALS'], 'e=mc^2')
+        self.assertEqual(info.env.key, 'value')
+        self.assertEqual(info.networks.first.ip_address, '10.0.0.2')
+        self.assertEqual(sorted(info.ports.tcp), [80, 8080])
+        self.assertEqual(info.ports.udp, [53])
+
+    def test_container_info_fields_are_lazy(self):
+        info = ContainerInfo(FakeContainer('c0001', 'sample'))
+
+        self.assertEqual(set(dict.keys(info)), {'raw', 'id', 'short_id', 'name', 'image', 'status', 'health'})
+
+        info.labels
+
+        self.assertIn('labels', dict.keys(info))
+        self.assertNotIn('networks', dict.keys(info))
+
+        info = ContainerInfo(FakeContainer('c0001', 'sample'), labels={'given': 'value'})
+
+        self.assertEqual(info.labels, {'given': 'value'})
+
+    def test_strings_are_shared(self):
+        first = ContainerInfo(FakeContainer('c0001', 'sample', labels={'com.docker.project': 'project'},
+                                            env=['KEY=value']))
+        second = ContainerInfo(FakeContainer('c0002', 'sample', labels={'com.docker.project': 'project'},
+                                             env=['KEY=value']))
+
+        self.assertIs(list(first.labels.keys())[0], list(second.labels.keys())[0])
+        self.assertIs(first.labels['com.docker.project'], second.labels['com.docker.project'])
+        self.assertIs(list(first.env.keys())[0], list(second.env.keys())[0])
+        self.assertIs(first.env.key, second.env.key)
+
+    def test_service_info(self):
+        raw = FakeService('s0001', 'app', labels={'service.label': 'on-service'}, networks=['n001'],
+                          virtual_ips=[{'NetworkID': 'ingress-id', 'Addr': '10.255.0.5/16'},
+                                       {'NetworkID': 'n001', 'Addr': '10.0.1.2/24'}],
+                          ports=[{'Protocol': 'tcp', 'PublishedPort': 8080, 'TargetPort': 5000}])
+
+        task_options = dict(labels={'task.label': 'on-task'}, env=['KEY=value'])
+
+        tasks = TaskList(TaskInfo(raw, t) for t in (
+            fake_task('t001', 's0001', 1, networks=[('ingress-id', 'ingress', None, '10.255.0.7/16'),
+                                                    ('n001', 'backend', None, '10.0.1.3/24')], **task_options),
+            fake_task('t002', 's0001', 2, networks=[('ingress-id', 'ingress', None, '10.255.0.8/16'),
+                                                    ('n001', 'backend', None, '10.0.1.4/24')], **task_options)
+        ))
+
+        info = ServiceInfo(raw, tasks=tasks)
+
+        for key in ('raw', 'labels', 'ingress', 'networks', 'ports', 'tasks'):
+            self.assertIn(key, info)
+
+        self.assertEqual(info.labels['service.label'], 'on-service')
+        self.assertEqual(info.ports.tcp, [5000])
+        self.assertEqual(info.ingress.ports.tcp, [8080])
+        self.assertEqual(info.ingress.id, 'ingress-id')
+        self.assertEqual(info.ingress.gateway, '10.255.0.5')
+        self.assertEqual(info.ingress.ip_addresses, ['10.255.0.7', '10.255.0.8'])
+
+        self.assertEqual(len(info.networks), 1)
+        self.assertEqual(info.networks.first.name, 'backend')
+        self.assertEqual(info.networks.first.gateway, '10.0.1.2')
+        self.assertEqual(info.networks.first.ip_addresses, ['10.0.1.3', '10.0.1.4'])
+
+        first_task = info.tasks.first
+
+        self.assertEqual(first_task.name, 'app.1.t001')
+        self.assertEqual(first_task.labels['task.label'], 'on-task')
+        self.assertEqual(first_task.labels['com.docker.swarm.service.name'], 'app')
+        self.assertEqual(first_task.env.key, 'value')
+        self.assertTrue(first_task.networks.matching('ingress').first.is_ingress)
+        self.assertFalse(first_task.networks.matching('backend').first.is_ingress)
+
+    def test_service_networks_without_tasks_on_them(self):
+        raw = FakeService('s0001', 'app', networks=['n001', 'n002'],
+                          virtual_ips=[{'NetworkID': 'n001', 'Addr': '10.0.1.2/24'},
+                                       {'NetworkID': 'n001', 'Addr': '10.0.1.200/24'}])
+
+        tasks = TaskList(TaskInfo(raw, t) for t in (
+            fake_task('t001', 's0001', 1, networks=[('n001', 'backend', None, '10.0.1.3/24')]),
+        ))
+
+        info = ServiceInfo(raw, tasks=tasks)
+
+        self.assertEqual(info.ingress.gateway, '')
+        self.assertEqual(len(info.ingress.ip_addresses), 0)
+
+        backend = info.networks.matching('n001').first
+        other = info.networks.matching('n002').first
+
+        self.assertEqual(backend.name, 'backend')
+        self.assertEqual(backend.gateway, '10.0.1.2')
+        self.assertEqual(backend.ip_addresses, ['10.0.1.3'])
+
+        self.assertIsNone(other.name)
+        self.assertIsNone(other.gateway)
+        self.assertEqual(other.ip_addresses, [])
+
+    def test_ingress_is_resolved_once_per_service(self):
+        raw = FakeService('s0001', 'app', networks=['n001'],
+                          virtual_ips=[{'NetworkID': 'ingress-id', 'Addr': '10.255.0.5/16'},
+                                       {'NetworkID': 'n001', 'Addr': '10.0.1.2/24'}])
+
+        calls = list()
+        original = ServiceInfo.probable_ingress_id
+
+        def probable_ingress_id(service):
+            calls.append(service)
+            return original(service)
+
+        ServiceInfo.probable_ingress_id = staticmethod(probable_ingress_id)
+
+        try:
+            tasks = ServiceInfo.task_list(raw, (
+                fake_task('t001', 's0001', 1, networks=[('ingress-id', 'ingress', None, '10.255.0.7/16')]),
+                fake_task('t002', 's0001', 2, networks=[('ingress-id', 'ingress', None, '10.255.0.8/16')])
+            ))
+
+            self.assertTrue(all(t.networks.first.is_ingress for t in tasks))
+            self.assertEqual(len(calls), 1)
+
+        finally:
+            ServiceInfo.probable_ingress_id = staticmethod(original)
@@ -1,4 +1,5 @@
 import os
+import time
 import unittest
 import docker_helper
 
@@ -102,3 +103,124 @@ class PyGenTest(unittest.TestCase):
         self.assertEqual(app.timer.min_interval, 12)
         self.assertEqual(app.timer.max_interval, 40)
 
+    def test_reconnects_event_stream(self):
+        app = pygen.PyGen(template='#', events=['start'])
+        app.reconnect_interval = 0
+
+        now = int(time.time())
+        calls = list()
+
+        def mock_events(**kwargs):
+            calls.append(kwargs.get('since'))
+
+            if len(calls) == 1:
+                yield {'status': 'start', 'id': 'c1', 'time': now}
+                yield {'status': 'start', 'id': 'c2', 'time': now}
+                raise Exception('Connection lost')
+
+            elif len(calls) == 2:
+                # replayed events are skipped
+                yield {'status': 'start', 'id': 'c1', 'time': now}
+                yield {'status': 'start', 'id': 'c2', 'time': now}
+                yield {'status': 'start', 'id': 'c3', 'time': now}
+                yield {'status': 'start', 'id': 'c4', 'time': now + 1}
+
+        app.api.events = mock_events
+
+        events = app.read_events()
+
+        self.assertEqual(list(next(events)['id'] for _ in range(4)), ['c1', 'c2', 'c3', 'c4'])
+        self.assertEqual(calls, [None, now])
+
+    def test_replays_events_during_first_update(self):
+        app = pygen.PyGen(template='#', events=['start'])
+
+        loaded_at = list()
+
+        def mock_update_target():
+            # the container starts while the first listing is in progress
+            loaded_at.append(int(time.time()))
+
+        app._update_target = mock_update_target
+        app.update_target()
+
+        calls = list()
+
+        def mock_events(**kwargs):
+            calls.append(kwargs.get('since'))
+
+            # the daemon only sends earlier events when asked to
+            if kwargs.get('since') is not None and kwargs['since'] <= loaded_at[0]:
+                yield {'status': 'start', 'id': 'c1', 'time': loaded_at[0]}
+
+            yield {'status': 'start', 'id': 'c2', 'time': loaded_at[0] + 1}
+
+        app.api.events = mock_events
+
+        events = app.read_events()
+
+        self.assertEqual(list(next(events)['id'] for _ in range(2)), ['c1', 'c2'])
+        self.assertEqual(calls, [app.first_update_at])
+        self.assertLessEqual(app.first_update_at, loaded_at[0])
+
+    def test_replays_after_short_outage_on_quiet_host(self):
+        app = pygen.PyGen(template='#', events=['start'], max_replay=10)
+        app.reconnect_interval = 0
+
+        last_event_time = int(time.time()) - 120
+        calls = list()
+        updates = list()
+
+        def mock_events(**kwargs):
+            calls.append(kwargs.get('since'))
+
+            if len(calls) == 1:
+                yield {'status': 'start', 'id': 'c1', 'time': last_event_time}
+                raise Exception('Connection lost')
+
+            else:
+                yield {'status': 'start', 'id': 'c2', 'time': int(time.time())}
+
+        app.api.events = mock_events
+        app.update_target = lambda *args, **kwargs: updates.append(1)
+
+        events = app.read_events()
+
+        self.assertEqual(list(next(events)['id'] for _ in range(2)), ['c1', 'c2'])
+        self.assertEqual(len(updates), 0)
+        self.assertEqual(calls, [None, last_event_time])
+
+    def test_resyncs_after_long_event_gap(self):
+        app = pygen.PyGen(template='#', events=['start'], max_replay=0.05)
+        app.reconnect_interval = 0.1
+
+        calls = list()
+        updates = list()
+
+        def mock_events(**kwargs):
+            calls.append(kwargs.get('since'))
+
+            if len(calls) == 1:
+                yield {'status': 'start', 'id': 'c1', 'time': int(time.time()) - 60}
+
+            else:
+                yield {'status': 'start', 'id': 'c2', 'time': int(time.time())}
+
+        app.api.events = mock_events
+        app.update_target = lambda *args, **kwargs: updates.append(1)
+
+        events = app.read_events()
+
+        self.assertEqual(list(next(events)['id'] for _ in range(2)), ['c1', 'c2'])
+        self.assertEqual(len(updates), 1)
+        self.assertGreaterEqual(calls[1], int(time.time()) - 1)
+
+    def test_watch_stops_at_until(self):
+        app = pygen.PyGen(template='#', events=['start'])
+
+        def mock_events(**kwargs):
+            yield {'status': 'start', 'id': 'c1', 'time': int(time.time())}
+
+        app.api.events = mock_events
+
+        self.assertEqual(len(list(app.read_events(until=time.time()))), 1)